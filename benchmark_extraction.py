@@ -0,0 +1,135 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+
+from landmark_io import LANDMARK_COLUMNS, load_landmarks
+from pose_extraction import PROFILES, process_video
+
+
+def run_profile(input_file: str, profile: str, output_file: str) -> dict:
+    """
+    Extract a clip headless under one profile, measuring wall-clock and CPU
+    time (all threads of this process, including MediaPipe's).
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    # Keep the benchmark table readable: the extraction's own progress output is discarded
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = process_video(input_file, output_file, headless=True, profile=profile)
+    cpu_seconds = time.process_time() - cpu_start
+    wall_seconds = time.perf_counter() - wall_start
+
+    if summary is None:
+        raise IOError(f"Could not open video file {input_file}")
+    return {
+        "profile": profile,
+        "frames": summary["frames"],
+        "frames_analyzed": summary["frames_analyzed"],
+        "frames_with_pose": summary["frames_with_pose"],
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_seconds,
+        "fps": summary["frames"] / wall_seconds if wall_seconds > 0 else 0.0,
+        "output": summary["output"],
+    }
+
+
+def landmark_deviation(reference_file: str, output_file: str) -> Optional[dict]:
+    """
+    Compare the landmarks of two extractions on the frames where both found a
+    pose: mean and 95th percentile landmark distance in pixels of the source
+    video, and the share of the reference's pose frames that were analyzed
+    and detected.
+    """
+    # Frames without a pose are NaN rows in both extractions
+    reference = load_landmarks(reference_file).dropna(subset=LANDMARK_COLUMNS)
+    landmarks = load_landmarks(output_file).dropna(subset=LANDMARK_COLUMNS)
+    common = reference.index.intersection(landmarks.index)
+    if len(common) == 0:
+        return None
+
+    width = reference.attrs["metadata"].get("width") or 1
+    height = reference.attrs["metadata"].get("height") or 1
+    difference = (landmarks.loc[common, LANDMARK_COLUMNS].to_numpy(dtype=np.float64)
+                  - reference.loc[common, LANDMARK_COLUMNS].to_numpy(dtype=np.float64)).reshape(len(common), -1, 3)
+    pixels = np.hypot(difference[..., 0] * width, difference[..., 1] * height)
+
+    return {
+        "compared_frames": len(common),
+        "mean_px": float(pixels.mean()),
+        "p95_px": float(np.percentile(pixels, 95)),
+        "coverage": len(common) / len(reference),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction profiles on a reference clip "
+                                     "(throughput, CPU time and landmark deviation)")
+    parser.add_argument("-i", "--input", required=True, help="Reference video clip")
+    parser.add_argument("--profiles", default=",".join(PROFILES),
+                        help=f"Comma-separated profiles to run (default: {','.join(PROFILES)})")
+    parser.add_argument("--reference", default="accurate",
+                        help="Profile the landmark deviation is measured against (default: accurate)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    profiles = [profile.strip() for profile in args.profiles.split(",")]
+    unknown = [profile for profile in profiles + [args.reference] if profile not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profile(s): {', '.join(unknown)}")
+    if args.reference not in profiles:
+        profiles.insert(0, args.reference)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for profile in profiles:
+            print(f"Running profile '{profile}'...")
+            try:
+                results[profile] = run_profile(args.input, profile, os.path.join(temp_dir, f"{profile}.npz"))
+            except Exception as e:
+                # e.g. the lite/heavy models are downloaded on first use and may be unavailable offline
+                print(f"  failed: {e}")
+                results[profile] = {"profile": profile, "error": str(e)}
+
+        reference_output = results[args.reference].get("output")
+        for profile, result in results.items():
+            if "error" in result or result["output"] is None or reference_output is None:
+                continue
+            result["deviation"] = landmark_deviation(reference_output, result["output"])
+
+    if reference_output is None:
+        print(f"No landmarks from the reference profile '{args.reference}', so deviations are not reported")
+
+    print()
+    print(f"{'profile':<10} {'fps':>8} {'CPU s':>8} {'CPU ms/frame':>13} {'analyzed':>9} {'with pose':>10} "
+          f"{'mean dev px':>12} {'p95 dev px':>11} {'coverage':>9}")
+    for profile, result in results.items():
+        if "error" in result:
+            print(f"{profile:<10} failed: {result['error']}")
+            continue
+        deviation = result.get("deviation")
+        if deviation:
+            deviation_text = f"{deviation['mean_px']:12.2f} {deviation['p95_px']:11.2f} {deviation['coverage']:9.1%}"
+        else:
+            deviation_text = f"{'-':>12} {'-':>11} {'-':>9}"
+        cpu_per_frame = result["cpu_seconds"] / result["frames"] * 1000 if result["frames"] else 0.0
+        print(f"{profile:<10} {result['fps']:8.1f} {result['cpu_seconds']:8.1f} {cpu_per_frame:13.2f} "
+              f"{result['frames_analyzed']:9d} {result['frames_with_pose']:10d} {deviation_text}")
+    print(f"Deviation is measured against '{args.reference}' on the frames where both found a pose.")
+
+    if args.json:
+        for result in results.values():
+            result.pop("output", None)
+        with open(args.json, "w") as f:
+            json.dump({"input": args.input, "reference": args.reference, "results": results}, f, indent=4)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from kinematics_calculator import (
+    CSV_ENGINE,
+    KINEMATICS_COLUMNS,
+    LANDMARK_COLUMNS,
+    parse_pose_csv,
+    required_landmarks,
+)
+
+
+def generate_pose_csv(filename: str, num_frames: int, chunk_size: int = 100_000):
+    """
+    Write a synthetic pose CSV with the same layout as the extraction scripts
+    (33 landmarks x 3 coordinates per row), in chunks to keep memory bounded.
+    """
+    rng = np.random.default_rng(0)
+    written = 0
+    while written < num_frames:
+        rows = min(chunk_size, num_frames - written)
+        chunk = pd.DataFrame(rng.random((rows, len(LANDMARK_COLUMNS))), columns=LANDMARK_COLUMNS)
+        chunk.to_csv(filename, mode="a" if written else "w", header=not written, index=False)
+        written += rows
+
+
+def time_call(func, repeats: int) -> float:
+    """
+    Return the best wall-clock time of `repeats` calls to func.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pose CSV ingestion (full read vs. column-pruned typed read)")
+    parser.add_argument("--csv", help="Existing pose CSV to benchmark (default: generate a synthetic one)")
+    parser.add_argument("--frames", type=int, default=1_000_000,
+                        help="Number of frames in the generated CSV (default: 1000000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per variant; the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    csv_file = args.csv
+    temp_dir = None
+    if csv_file is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        csv_file = os.path.join(temp_dir.name, "pose_data.csv")
+        print(f"Generating {args.frames} frame pose CSV...")
+        generate_pose_csv(csv_file, args.frames)
+
+    size_mb = os.path.getsize(csv_file) / 1e6
+    print(f"Input: {csv_file} ({size_mb:.1f} MB)")
+    print(f"Parser engine: {CSV_ENGINE}, landmarks read: {len(required_landmarks(KINEMATICS_COLUMNS))}/33")
+
+    variants = [
+        ("pd.read_csv (all columns, inferred dtypes)", lambda: pd.read_csv(csv_file)),
+        ("parse_pose_csv (pruned, float64)", lambda: parse_pose_csv(csv_file, KINEMATICS_COLUMNS, np.float64)),
+        ("parse_pose_csv (pruned, float32)", lambda: parse_pose_csv(csv_file, KINEMATICS_COLUMNS, np.float32)),
+    ]
+
+    baseline = None
+    for name, func in variants:
+        elapsed = time_call(func, args.repeats)
+        if baseline is None:
+            baseline = elapsed
+        print(f"{name:<45} {elapsed:8.3f} s  ({baseline / elapsed:5.2f}x)")
+
+    if temp_dir is not None:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -92,7 +92,13 @@ class RehabDashboard:
     
     def calculate_change_rate(self, data, fps=30, gussian_rate=6):
         """Calculate rate of change in the data."""
-        data = np.array(data)
+        data = np.array(data, dtype=float)
+        # Bridge frames without a pose (NaN) by linear interpolation so the filter
+        # and the derivative see a continuous signal on the frame grid
+        missing = np.isnan(data)
+        if missing.any() and not missing.all():
+            indices = np.arange(len(data))
+            data[missing] = np.interp(indices[missing], indices[~missing], data[~missing])
         if gussian_rate != 0:
             data = gaussian_filter1d(data, round(gussian_rate*fps/30))
         data = np.diff(data)
@@ -195,13 +201,14 @@ class RehabDashboard:
 
         return result
     
-    def detect_action_phases(self, values, num_phases=3):
+    def detect_action_phases(self, values, num_phases=3, fps=30):
         """
         Detects action phases in the motion data using improved peak/valley detection.
         
         Args:
             values: The array of kinematic values (preferably knee angle)
             num_phases: Number of phases to detect (default: 3)
+            fps: Rate of the values in frames per second (default: 30)
             
         Returns:
             A list of tuples containing (start_index, end_index, phase_name) for each phase
@@ -210,10 +217,10 @@ class RehabDashboard:
             return []
         
         # Calculate rate of change
-        change_rate = self.calculate_change_rate(values)
+        change_rate = self.calculate_change_rate(values, fps)
         
         # Segment the data using the improved algorithm
-        segments = self.segment_by_peaks_valleys(change_rate, loops=num_phases)
+        segments = self.segment_by_peaks_valleys(change_rate, fps, loops=num_phases)
         
         # If segmentation failed or didn't produce enough segments, fall back to simple splitting
         if not segments or len(segments) < num_phases:
@@ -644,8 +651,8 @@ class RehabDashboard:
                                         rep_values.append(values[idx])
                                 
                                 if rep_values:
-                                    avg_rep_values.append(np.mean(rep_values))
-                                    std_rep_values.append(np.std(rep_values))
+                                    avg_rep_values.append(np.nanmean(rep_values))
+                                    std_rep_values.append(np.nanstd(rep_values))
                                 else:
                                     avg_rep_values.append(0)
                                     std_rep_values.append(0)
@@ -727,7 +734,8 @@ class RehabDashboard:
                         ref_values = values
                     
                     # Detect action phases using the reference metric
-                    phases = self.detect_action_phases(ref_values, num_phases)
+                    phases = self.detect_action_phases(ref_values, num_phases,
+                                                       session_data["metadata"].get("fps", 30))
                     
                     if phases:
                         # Prepare for plotting
@@ -743,10 +751,10 @@ class RehabDashboard:
                             phase_values = values[start_idx:end_idx+1]
                             
                             if phase_values:
-                                phase_avg = np.mean(phase_values)
-                                phase_std = np.std(phase_values)
-                                phase_min = np.min(phase_values)
-                                phase_max = np.max(phase_values)
+                                phase_avg = np.nanmean(phase_values)
+                                phase_std = np.nanstd(phase_values)
+                                phase_min = np.nanmin(phase_values)
+                                phase_max = np.nanmax(phase_values)
                                 
                                 phase_names.append(phase_name)
                                 phase_avg_values.append(phase_avg)
@@ -1022,11 +1030,11 @@ class RehabDashboard:
                     "name": phase_name,
                     "start_idx": int(start_idx),
                     "end_idx": int(end_idx),
-                    "avg": float(np.mean(phase_values)),
-                    "max": float(np.max(phase_values)),
-                    "min": float(np.min(phase_values)),
-                    "std": float(np.std(phase_values)),
-                    "rom": float(np.max(phase_values) - np.min(phase_values))
+                    "avg": float(np.nanmean(phase_values)),
+                    "max": float(np.nanmax(phase_values)),
+                    "min": float(np.nanmin(phase_values)),
+                    "std": float(np.nanstd(phase_values)),
+                    "rom": float(np.nanmax(phase_values) - np.nanmin(phase_values))
                 })
         
         return phase_info
@@ -1179,8 +1187,20 @@ class RehabDashboard:
                         metric = next(m for m in self.metrics if m.lower() == col.lower())
                         metrics[metric] = df[col].tolist()
                 
-                # Create a frames list (assuming 1 frame per row)
-                frames = list(range(len(df)))
+                # Use the source frame of each row when the extraction recorded it
+                # (frames without a pose are NaN rows), else assume 1 frame per row
+                if "frame" in df.columns:
+                    frames = df["frame"].astype(int).tolist()
+                else:
+                    frames = list(range(len(df)))
+                
+                # Rate of the rows, from their timestamps when available
+                fps = 30
+                if "timestamp" in df.columns and len(df) > 1:
+                    interval = np.nanmedian(np.diff(df["timestamp"].to_numpy(dtype=float)))
+                    if interval > 0:
+                        fps = 1.0 / interval
+                session_data["metadata"]["fps"] = fps
                 
                 # Initialize phases to None
                 phases = None
@@ -1198,9 +1218,9 @@ class RehabDashboard:
                             # Use the sum of both knee angles for better detection
                             both_knee_avg = np.array(metrics["left_knee_angle"]) + np.array(metrics["right_knee_angle"])
                             # Calculate rate of change
-                            change_rate = self.calculate_change_rate(both_knee_avg)
+                            change_rate = self.calculate_change_rate(both_knee_avg, fps)
                             # Detect segments
-                            segments = self.segment_by_peaks_valleys(change_rate, loops=num_phases)
+                            segments = self.segment_by_peaks_valleys(change_rate, fps, loops=num_phases)
                             
                             if segments and len(segments) >= num_phases:
                                 # Convert segments to phases format
@@ -1230,7 +1250,7 @@ class RehabDashboard:
                             
                             # Detect phases using the reference metric with advanced method
                             if ref_values:
-                                phases = self.detect_action_phases(ref_values, num_phases)
+                                phases = self.detect_action_phases(ref_values, num_phases, fps)
                     
                     # If advanced segmentation is disabled or failed, use simple equal divisions
                     if not phases:
@@ -1251,9 +1271,10 @@ class RehabDashboard:
                 # Process each metric
                 for metric, values in metrics.items():
                     # Calculate statistics
-                    avg = np.mean(values)
-                    maximum = np.max(values)
-                    minimum = np.min(values)
+                    # Frames without a pose are NaN and left out of the statistics
+                    avg = np.nanmean(values)
+                    maximum = np.nanmax(values)
+                    minimum = np.nanmin(values)
                     
                     # Store the metric data
                     session_data[metric] = {
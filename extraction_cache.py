@@ -0,0 +1,276 @@
+import os
+import glob
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from typing import Callable, List, Optional
+
+# Default cache location (override with --cache DIR or MQ_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.environ.get("MQ_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "motion_quantification"))
+
+# Default size bound; least recently used entries are evicted beyond it
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(text: str) -> int:
+    """
+    Parse a size such as "500M", "10G" or "1048576" into bytes.
+    """
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1] if text and text[-1] in SIZE_UNITS else ""
+    number = text[:-1] if unit else text
+    return int(float(number) * SIZE_UNITS[unit])
+
+
+def format_size(num_bytes: int) -> str:
+    """
+    Format a byte count for display.
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Return the SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(video_hash: str, params: dict) -> str:
+    """
+    Key of a cached extraction: hash of the video content and every setting
+    that affects the extracted landmarks (Pose parameters, sampling, output
+    format, extractor version, ...).
+    """
+    description = json.dumps({"video": video_hash, "params": params}, sort_keys=True)
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of landmark files. Each entry is a landmark file
+    <key>.<format> plus a <key>.json sidecar with the source, parameters, run
+    summary and last access time. There is no shared index, so several
+    extraction processes can use the same cache at once. The cache is kept
+    under max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Directory holding the cache entries (created if needed)
+            max_bytes: Size bound enforced after every new entry
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def write_entry(self, entry: dict):
+        """
+        Save an entry's sidecar atomically.
+        """
+        path = self.entry_path(entry["key"])
+        temp_file = f"{path}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(entry, f, indent=4)
+        os.replace(temp_file, path)
+
+    def entries(self) -> List[dict]:
+        """
+        Return all entries, least recently used first.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.json")):
+            try:
+                with open(path, "r") as f:
+                    entries.append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                # Removed or being replaced by another process
+                continue
+        return sorted(entries, key=lambda entry: entry["last_used"])
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """
+        Return the entry for a key and mark it as used, or None on a miss.
+        """
+        try:
+            with open(self.entry_path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if entry["file"] is not None and not os.path.exists(os.path.join(self.cache_dir, entry["file"])):
+            return None
+
+        entry["last_used"] = time.time()
+        entry["hits"] = entry.get("hits", 0) + 1
+        self.write_entry(entry)
+        return entry
+
+    def store(self, key: str, output_file: Optional[str], summary: dict, source: str, video_hash: str,
+              params: dict) -> dict:
+        """
+        Add an extraction to the cache (output_file None records that no frame
+        was analyzed), then evict old entries beyond the size bound.
+        """
+        file_name = None
+        size = 0
+        if output_file is not None:
+            extension = os.path.splitext(output_file)[1]
+            file_name = f"{key}{extension}"
+            temp_file = os.path.join(self.cache_dir, f"{file_name}.{os.getpid()}.tmp")
+            shutil.copyfile(output_file, temp_file)
+            os.replace(temp_file, os.path.join(self.cache_dir, file_name))
+            size = os.path.getsize(os.path.join(self.cache_dir, file_name))
+
+        now = time.time()
+        entry = {
+            "key": key,
+            "source": os.path.abspath(source),
+            "video_sha256": video_hash,
+            "params": params,
+            "file": file_name,
+            "size": size,
+            "created": now,
+            "last_used": now,
+            "hits": 0,
+            "summary": {name: value for name, value in summary.items() if name != "output"},
+        }
+        self.write_entry(entry)
+        self.evict(self.max_bytes)
+        return entry
+
+    def remove(self, entry: dict):
+        """
+        Delete an entry and its landmark file.
+        """
+        for name in (entry["file"], f"{entry['key']}.json"):
+            if name is None:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def evict(self, max_bytes: int) -> List[dict]:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        Returns the removed entries.
+        """
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        removed = []
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            self.remove(entry)
+            total -= entry["size"]
+            removed.append(entry)
+        return removed
+
+    def total_size(self) -> int:
+        return sum(entry["size"] for entry in self.entries())
+
+
+def cached_extraction(input_file: str, output_file: str, params: dict, extract: Callable[[], Optional[dict]],
+                      cache: ExtractionCache) -> Optional[dict]:
+    """
+    Return the extraction summary for input_file, copying a cached landmark
+    file to output_file when the same video was already extracted with the
+    same params, and otherwise running extract() (which writes output_file
+    and returns its summary) and caching the result. Runs whose summary is
+    not "complete" (stopped before the end of the video) are not cached.
+    """
+    hash_start = time.perf_counter()
+    video_hash = hash_file(input_file)
+    params = dict(params, output_format=os.path.splitext(output_file)[1].lower())
+    key = cache_key(video_hash, params)
+
+    entry = cache.lookup(key)
+    if entry is not None:
+        if entry["file"] is not None:
+            shutil.copyfile(os.path.join(cache.cache_dir, entry["file"]), output_file)
+            print(f"Cache hit ({key[:12]}): copied landmarks to {output_file} "
+                  f"in {time.perf_counter() - hash_start:.2f} s")
+        else:
+            print(f"Cache hit ({key[:12]}): no frames were analyzed in this video.")
+        return dict(entry["summary"], output=output_file if entry["file"] is not None else None, cached=True)
+
+    summary = extract()
+    if summary is not None:
+        if summary.get("complete", True):
+            cache.store(key, summary["output"], summary, input_file, video_hash, params)
+        else:
+            # A truncated output must never be served for the whole video
+            print("Extraction was stopped before the end of the video; not caching it")
+        summary = dict(summary, cached=False)
+    return summary
+
+
+def list_entries(cache: ExtractionCache):
+    """
+    Print the cache entries, most recently used first.
+    """
+    entries = cache.entries()
+    if not entries:
+        print(f"Cache {cache.cache_dir} is empty")
+        return
+    print(f"{'key':<14} {'size':>10} {'hits':>5} {'last used':<20} source")
+    for entry in reversed(entries):
+        last_used = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["last_used"]))
+        size = format_size(entry["size"]) if entry["file"] is not None else "no frames"
+        print(f"{entry['key'][:12]:<14} {size:>10} {entry.get('hits', 0):5d} {last_used:<20} {entry['source']}")
+    print(f"{len(entries)} entries, {format_size(sum(entry['size'] for entry in entries))} in {cache.cache_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and prune the pose extraction cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Cache directory (default: {DEFAULT_CACHE_DIR})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List cached extractions, most recently used first")
+    prune_parser = subparsers.add_parser("prune", help="Remove cached extractions")
+    prune_parser.add_argument("--max-size", help="Evict least recently used entries until the cache fits (e.g. 2G)")
+    prune_parser.add_argument("--older-than", type=float, help="Remove entries not used for this many days")
+    prune_parser.add_argument("--all", action="store_true", help="Remove every entry")
+    args = parser.parse_args()
+
+    cache = ExtractionCache(args.cache_dir)
+    if args.command == "list":
+        list_entries(cache)
+        return
+
+    if not (args.max_size or args.older_than is not None or args.all):
+        parser.error("prune needs --max-size, --older-than or --all")
+    removed = []
+    if args.all:
+        for entry in cache.entries():
+            cache.remove(entry)
+            removed.append(entry)
+    if args.older_than is not None:
+        cutoff = time.time() - args.older_than * 86400
+        for entry in cache.entries():
+            if entry["last_used"] < cutoff:
+                cache.remove(entry)
+                removed.append(entry)
+    if args.max_size:
+        removed.extend(cache.evict(parse_size(args.max_size)))
+
+    print(f"Removed {len(removed)} entries ({format_size(sum(entry['size'] for entry in removed))}); "
+          f"{format_size(cache.total_size())} left in {cache.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import json
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    Low-overhead per-frame timing of the extraction stages (decode, colour
+    conversion, inference, drawing, ...). Callers take a timestamp with
+    StageTimer.now() before a stage and call record() after it; durations are
+    kept per stage in nanoseconds. Stages may be recorded from any thread.
+
+    Stages that fill preallocated frame buffers also report, through
+    allocated(), every buffer they had to allocate instead of reusing one, so
+    the report shows the allocations per frame of each stage.
+
+    With `trace` enabled every measurement is also kept as an event, so the
+    run can be written as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+    """
+
+    # Monotonic nanosecond clock used for all measurements
+    now = staticmethod(time.perf_counter_ns)
+
+    def __init__(self, trace: bool = False):
+        """
+        Args:
+            trace: Keep every measurement as a trace event for write_trace()
+        """
+        self.durations = {}
+        self.allocations = {}
+        self.trace = trace
+        self.events = []
+        self.thread_names = {}
+        self.origin = time.perf_counter_ns()
+
+    def record(self, stage: str, start: int, frame: Optional[int] = None):
+        """
+        Record that `stage` ran from `start` (a StageTimer.now() value) until now.
+        """
+        end = time.perf_counter_ns()
+        durations = self.durations.get(stage)
+        if durations is None:
+            durations = self.durations.setdefault(stage, [])
+        durations.append(end - start)
+        if self.trace:
+            thread_id = threading.get_ident()
+            if thread_id not in self.thread_names:
+                # Threads have usually exited by the time the trace is written
+                self.thread_names[thread_id] = threading.current_thread().name
+            self.events.append((stage, thread_id, start, end - start, frame))
+
+    def allocated(self, stage: str, count: int = 1):
+        """
+        Count `count` frame buffers that `stage` allocated instead of reusing.
+        """
+        self.allocations[stage] = self.allocations.get(stage, 0) + count
+
+    def summary(self) -> dict:
+        """
+        Per-stage count, mean, p50, p95 and p99 (milliseconds), total seconds,
+        share of the total time measured over all stages and frame buffer
+        allocations (in total and per frame).
+        """
+        totals = {stage: sum(durations) for stage, durations in self.durations.items()}
+        grand_total = sum(totals.values())
+        summary = {}
+        for stage, durations in self.durations.items():
+            values = np.asarray(durations, dtype=np.float64) / 1e6
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[stage] = {
+                "count": len(values),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "total_seconds": totals[stage] / 1e9,
+                "share": totals[stage] / grand_total if grand_total else 0.0,
+                "allocations": self.allocations.get(stage, 0),
+                "allocations_per_frame": self.allocations.get(stage, 0) / len(values),
+            }
+        return summary
+
+    def report(self) -> str:
+        """
+        Format the summary as a table, stages in the order they were first recorded.
+        """
+        lines = [f"{'Stage timing':<16} {'frames':>7} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                 f"{'total s':>8} {'share':>7} {'allocs/frame':>12}"]
+        for stage, stats in self.summary().items():
+            lines.append(f"  {stage:<14} {stats['count']:7d} {stats['mean_ms']:8.2f} {stats['p50_ms']:8.2f} "
+                         f"{stats['p95_ms']:8.2f} {stats['p99_ms']:8.2f} {stats['total_seconds']:8.2f} "
+                         f"{stats['share']:7.1%} {stats['allocations_per_frame']:12.3f}")
+        return "\n".join(lines)
+
+    def write_trace(self, filename: str):
+        """
+        Write the recorded events in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = []
+        for stage, thread_id, start, duration, frame in self.events:
+            event = {
+                "name": stage,
+                "cat": "extraction",
+                "ph": "X",
+                "ts": (start - self.origin) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": thread_id,
+            }
+            if frame is not None:
+                event["args"] = {"frame": frame}
+            events.append(event)
+        # Label each thread's lane with its name
+        for thread_id, name in self.thread_names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}})
+
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"Trace with {len(self.events)} events saved to {filename}")
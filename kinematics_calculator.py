@@ -1,8 +1,93 @@
 import pandas as pd
 import numpy as np
 import argparse
+import csv
 import os
-from typing import List, Tuple, Dict
+import importlib.util
+from typing import Iterator, List, Optional, Tuple
+
+from landmark_io import (
+    LANDMARK_COLUMNS,
+    NUM_LANDMARKS,
+    TIME_COLUMNS,
+    is_binary_landmark_file,
+    is_session_manifest,
+    iter_landmark_chunks,
+    load_landmarks,
+    session_segments,
+)
+
+
+# MediaPipe pose landmarks reference: https://mediapipe.dev/images/mobile/pose_tracking_full_body_landmarks.png
+LANDMARKS = {
+    # Left side
+    "left_shoulder": 11,
+    "left_elbow": 13,
+    "left_wrist": 15,
+    "left_hip": 23,
+    "left_knee": 25,
+    "left_ankle": 27,
+    # Right side
+    "right_shoulder": 12,
+    "right_elbow": 14,
+    "right_wrist": 16,
+    "right_hip": 24,
+    "right_knee": 26,
+    "right_ankle": 28,
+    # Central points
+    "nose": 0,
+    "left_ear": 7,
+    "right_ear": 8,
+}
+
+# Output columns of the kinematics table, in order (after the "frame" column)
+KINEMATICS_COLUMNS = [
+    # Joint angles
+    "left_knee_angle",
+    "right_knee_angle",
+    "left_hip_angle",
+    "right_hip_angle",
+    "left_ankle_angle",
+    "right_ankle_angle",
+    "left_shoulder_angle",
+    "right_shoulder_angle",
+    "left_elbow_angle",
+    "right_elbow_angle",
+    # Trunk angles
+    "trunk_flexion",
+    "trunk_lateral_flexion",
+    # Neck angles
+    "neck_flexion",
+    "neck_lateral_flexion",
+    # Symmetry metrics
+    "knee_angle_symmetry",
+    "hip_angle_symmetry",
+    "shoulder_angle_symmetry",
+]
+
+# Named landmarks each output column depends on, used to prune CSV ingestion
+METRIC_LANDMARKS = {
+    "left_knee_angle": ["left_hip", "left_knee", "left_ankle"],
+    "right_knee_angle": ["right_hip", "right_knee", "right_ankle"],
+    "left_hip_angle": ["left_hip", "left_knee"],
+    "right_hip_angle": ["right_hip", "right_knee"],
+    "left_ankle_angle": ["left_knee", "left_ankle"],
+    "right_ankle_angle": ["right_knee", "right_ankle"],
+    "left_shoulder_angle": ["left_shoulder", "left_elbow"],
+    "right_shoulder_angle": ["right_shoulder", "right_elbow"],
+    "left_elbow_angle": ["left_shoulder", "left_elbow", "left_wrist"],
+    "right_elbow_angle": ["right_shoulder", "right_elbow", "right_wrist"],
+    "trunk_flexion": ["left_hip", "right_hip", "left_shoulder", "right_shoulder"],
+    "trunk_lateral_flexion": ["left_hip", "right_hip", "left_shoulder", "right_shoulder"],
+    "neck_flexion": ["left_shoulder", "right_shoulder", "nose"],
+    "neck_lateral_flexion": ["left_shoulder", "right_shoulder", "left_ear", "right_ear"],
+    "knee_angle_symmetry": ["left_hip", "left_knee", "left_ankle", "right_hip", "right_knee", "right_ankle"],
+    "hip_angle_symmetry": ["left_hip", "left_knee", "right_hip", "right_knee"],
+    "shoulder_angle_symmetry": ["left_shoulder", "left_elbow", "right_shoulder", "right_elbow"],
+}
+
+# pyarrow's CSV reader is multithreaded; fall back to the C parser without it
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") is not None else "c"
 
 
 def calculate_angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
@@ -29,15 +114,93 @@ def calculate_angle(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> float:
     return angle
 
 
-def parse_pose_csv(csv_file: str) -> pd.DataFrame:
+def required_landmarks(metrics: Optional[List[str]] = None) -> List[int]:
+    """
+    Return the sorted MediaPipe landmark indices needed to compute the given
+    kinematics columns (default: all of KINEMATICS_COLUMNS).
+    """
+    if metrics is None:
+        metrics = KINEMATICS_COLUMNS
+    
+    indices = set()
+    for metric in metrics:
+        if metric not in METRIC_LANDMARKS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of: {', '.join(KINEMATICS_COLUMNS)}")
+        indices.update(LANDMARKS[name] for name in METRIC_LANDMARKS[metric])
+    
+    return sorted(indices)
+
+
+def csv_time_columns(csv_file: str) -> List[str]:
+    """
+    Return the frame/timestamp columns present in a pose CSV's header.
+    """
+    with open(csv_file, "r", newline="") as f:
+        header = next(csv.reader(f), [])
+    return [column for column in TIME_COLUMNS if column in header]
+
+
+def csv_read_options(metrics: Optional[List[str]] = None, dtype=np.float64, engine: str = CSV_ENGINE,
+                     time_columns: Optional[List[str]] = None) -> dict:
+    """
+    Build the pd.read_csv keyword arguments for reading a pose CSV: explicit
+    dtype, parser engine and, when metrics are given, only the columns they need.
+    time_columns lists the frame/timestamp columns present in the file (see csv_time_columns).
+    """
+    read_options = {"dtype": dtype, "engine": engine}
+    landmark_columns = LANDMARK_COLUMNS
+    if metrics is not None:
+        landmark_columns = [
+            f"landmark_{i}_{axis}" for i in required_landmarks(metrics) for axis in ("x", "y", "z")
+        ]
+        read_options["usecols"] = landmark_columns + list(time_columns or [])
+    if time_columns:
+        # Frame indices stay integers; only the coordinates use the requested dtype
+        read_options["dtype"] = {column: dtype for column in landmark_columns}
+        read_options["dtype"].update({"frame": np.int64, "timestamp": np.float64})
+    if engine == "c":
+        # Match the correctly rounded values produced by the pyarrow parser
+        read_options["float_precision"] = "round_trip"
+    
+    return read_options
+
+
+def parse_pose_csv(csv_file: str, metrics: Optional[List[str]] = None, dtype=np.float64,
+                   camera: Optional[str] = None) -> pd.DataFrame:
     """
     Parse the CSV file generated by the pose estimation script.
-    Returns a DataFrame with all landmark coordinates.
+    Binary landmark stores (.parquet, .npz, .h5) are read transparently, and
+    the segments listed in a session manifest (.session.json) are read as one recording.
+    Returns a DataFrame with the landmark coordinates.
+    
+    Args:
+        csv_file: Path to the pose CSV file, binary landmark store or session manifest
+        metrics: Kinematics columns that will be computed; when given, only the
+            landmark columns they depend on are read (default: read every column)
+        dtype: Floating point type for the coordinate columns (np.float32 or np.float64)
+        camera: View to read from a multi-camera store (see motion_extract_multicam.py)
     """
     # Read the CSV file
     df = pd.DataFrame()
     try:
-        df = pd.read_csv(csv_file)
+        if is_session_manifest(csv_file):
+            # Rotated recording: the segments continue each other's frame indices
+            segments = [parse_pose_csv(segment, metrics, dtype, camera) for segment in session_segments(csv_file)]
+            if any(segment is None for segment in segments):
+                return None
+            df = pd.concat(segments)
+        elif is_binary_landmark_file(csv_file):
+            landmark_indices = required_landmarks(metrics) if metrics is not None else None
+            df = load_landmarks(csv_file, landmark_indices, camera)
+            df = df.astype({column: dtype for column in df.columns if column.startswith("landmark_")})
+        else:
+            if camera is not None:
+                raise ValueError(f"{csv_file} holds a single camera, so no camera can be selected")
+            time_columns = csv_time_columns(csv_file)
+            df = pd.read_csv(csv_file, **csv_read_options(metrics, dtype, time_columns=time_columns))
+            if "frame" in df.columns:
+                # Subsampled extractions record the source frame of every row
+                df = df.set_index("frame")
     except Exception as e:
         print(f"Error reading CSV file: {e}")
         return None
@@ -45,282 +208,281 @@ def parse_pose_csv(csv_file: str) -> pd.DataFrame:
     return df
 
 
-def extract_landmark_coordinates(df: pd.DataFrame) -> Dict[int, List[Tuple[float, float, float]]]:
+def extract_landmark_coordinates(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     """
     Extract coordinates for each landmark from all frames.
-    Returns a dictionary mapping frame_index -> list of landmark coordinates.
+    Returns (frame_index, landmarks), where landmarks is a C-contiguous array of
+    shape (frames, 33, 3) holding the x, y, z coordinates of every landmark.
     """
-    frames_data = {}
+    if all(column in df.columns for column in LANDMARK_COLUMNS):
+        # pandas stores each column separately, so gathering the rows costs a single
+        # copy; the reshape to (frames, 33, 3) is then a view of that buffer
+        values = np.ascontiguousarray(df[LANDMARK_COLUMNS].to_numpy())
+        landmarks = values.reshape(len(df), NUM_LANDMARKS, 3)
+    else:
+        # Column-pruned input: landmarks that were not read are left as NaN
+        present = [column for column in LANDMARK_COLUMNS if column in df.columns]
+        dtype = np.result_type(*df[present].dtypes) if present else np.float64
+        landmarks = np.full((len(df), NUM_LANDMARKS, 3), np.nan, dtype=dtype)
+        for i in range(NUM_LANDMARKS):
+            columns = LANDMARK_COLUMNS[3 * i:3 * i + 3]
+            if all(column in df.columns for column in columns):
+                landmarks[:, i] = df[columns].to_numpy()
     
-    for frame_idx, row in df.iterrows():
-        landmarks = []
-        
-        # For each of the 33 landmarks
-        for i in range(33):
-            x = row[f"landmark_{i}_x"]
-            y = row[f"landmark_{i}_y"]
-            z = row[f"landmark_{i}_z"]
-            landmarks.append((x, y, z))
-        
-        frames_data[frame_idx] = landmarks
+    return df.index.to_numpy(), landmarks
+
+
+def extract_timestamps(df: pd.DataFrame) -> Optional[np.ndarray]:
+    """
+    Return the per-row timestamps (seconds) of pose data, or None if it has none.
+    """
+    if "timestamp" not in df.columns:
+        return None
+    return df["timestamp"].to_numpy()
+
+
+def calculate_angles(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of calculate_angle.
+    a, b and c are (N, 3) arrays of points; returns the N angles (in degrees) at b.
+    """
+    # Calculate vectors
+    ba = a - b
+    bc = c - b
+    
+    # Calculate cosine of angle using row-wise dot products
+    cosine_angle = np.einsum("ij,ij->i", ba, bc) / (np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1))
+    angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
     
-    return frames_data
+    # Convert to degrees
+    return np.degrees(angle)
 
 
-def calculate_kinematics(frames_data: Dict[int, List[Tuple[float, float, float]]]) -> pd.DataFrame:
+def calculate_kinematics(landmarks: np.ndarray, frames=None, metrics: Optional[List[str]] = None,
+                         timestamps=None) -> pd.DataFrame:
     """
-    Calculate clinically relevant kinematics from the landmark data.
-    Returns a DataFrame with all calculated kinematics.
+    Calculate clinically relevant kinematics for a whole recording at once.
+    
+    Args:
+        landmarks: Array of shape (frames, 33, 3) with the x, y, z coordinates of every landmark
+        frames: Frame index for each row (default: 0..N-1)
+        metrics: Subset of KINEMATICS_COLUMNS to return (default: all)
+        timestamps: Source timestamp (seconds) of each row; when given, a
+            "timestamp" column follows the "frame" column
+    
+    Returns a DataFrame with a "frame" column followed by the requested kinematics columns.
     """
-    # Define the landmark indices for various joints
-    # MediaPipe pose landmarks reference: https://mediapipe.dev/images/mobile/pose_tracking_full_body_landmarks.png
-    landmarks = {
-        # Left side
-        "left_shoulder": 11,
-        "left_elbow": 13,
-        "left_wrist": 15,
-        "left_hip": 23,
-        "left_knee": 25,
-        "left_ankle": 27,
-        # Right side
-        "right_shoulder": 12,
-        "right_elbow": 14,
-        "right_wrist": 16,
-        "right_hip": 24,
-        "right_knee": 26,
-        "right_ankle": 28,
-        # Central points
-        "nose": 0,
-        "neck": 33,  # Not directly in MediaPipe, we'll calculate it
-        "left_ear": 7,
-        "right_ear": 8,
-    }
-    
-    # Initialize a dictionary to store the kinematics data
-    kinematics_data = {
-        # Joint angles
-        "left_knee_angle": [],
-        "right_knee_angle": [],
-        "left_hip_angle": [],
-        "right_hip_angle": [],
-        "left_ankle_angle": [],
-        "right_ankle_angle": [],
-        "left_shoulder_angle": [],
-        "right_shoulder_angle": [],
-        "left_elbow_angle": [],
-        "right_elbow_angle": [],
-        # Trunk angles
-        "trunk_flexion": [],
-        "trunk_lateral_flexion": [],
-        # Neck angles
-        "neck_flexion": [],
-        "neck_lateral_flexion": [],
-        # Symmetry metrics
-        "knee_angle_symmetry": [],
-        "hip_angle_symmetry": [],
-        "shoulder_angle_symmetry": []
-    }
-    
-    # Process each frame
-    for frame_idx, landmarks_list in frames_data.items():
-        # Create a function to get coordinates for a landmark
-        def get_landmark(idx):
-            if idx == 33:  # Calculate neck position as midpoint between shoulders
-                left_shoulder = np.array(landmarks_list[landmarks["left_shoulder"]])
-                right_shoulder = np.array(landmarks_list[landmarks["right_shoulder"]])
-                return (left_shoulder + right_shoulder) / 2
-            else:
-                return np.array(landmarks_list[idx])
-        
-        # Calculate joint angles
-        
-        # Knee angles (extension/flexion)
-        left_knee_angle = calculate_angle(
-            get_landmark(landmarks["left_hip"]), 
-            get_landmark(landmarks["left_knee"]), 
-            get_landmark(landmarks["left_ankle"])
-        )
-        right_knee_angle = calculate_angle(
-            get_landmark(landmarks["right_hip"]), 
-            get_landmark(landmarks["right_knee"]), 
-            get_landmark(landmarks["right_ankle"])
-        )
-        
-        # Hip angles (extension/flexion)
-        # Use torso as reference (approximate with a vertical line from hip)
-        left_hip_vertical = get_landmark(landmarks["left_hip"]) + np.array([0, -1, 0])
-        right_hip_vertical = get_landmark(landmarks["right_hip"]) + np.array([0, -1, 0])
-        
-        left_hip_angle = calculate_angle(
-            left_hip_vertical, 
-            get_landmark(landmarks["left_hip"]), 
-            get_landmark(landmarks["left_knee"])
-        )
-        right_hip_angle = calculate_angle(
-            right_hip_vertical, 
-            get_landmark(landmarks["right_hip"]), 
-            get_landmark(landmarks["right_knee"])
-        )
-        
-        # Ankle angles (dorsiflexion/plantarflexion)
-        # Approximate with a horizontal line from ankle
-        left_ankle_horizontal = get_landmark(landmarks["left_ankle"]) + np.array([1, 0, 0])
-        right_ankle_horizontal = get_landmark(landmarks["right_ankle"]) + np.array([1, 0, 0])
-        
-        left_ankle_angle = calculate_angle(
-            get_landmark(landmarks["left_knee"]),
-            get_landmark(landmarks["left_ankle"]),
-            left_ankle_horizontal
-        )
-        right_ankle_angle = calculate_angle(
-            get_landmark(landmarks["right_knee"]),
-            get_landmark(landmarks["right_ankle"]),
-            right_ankle_horizontal
-        )
-        
-        # Shoulder angles (flexion/extension)
-        left_shoulder_vertical = get_landmark(landmarks["left_shoulder"]) + np.array([0, -1, 0])
-        right_shoulder_vertical = get_landmark(landmarks["right_shoulder"]) + np.array([0, -1, 0])
-        
-        left_shoulder_angle = calculate_angle(
-            left_shoulder_vertical,
-            get_landmark(landmarks["left_shoulder"]),
-            get_landmark(landmarks["left_elbow"])
-        )
-        right_shoulder_angle = calculate_angle(
-            right_shoulder_vertical,
-            get_landmark(landmarks["right_shoulder"]),
-            get_landmark(landmarks["right_elbow"])
-        )
-        
-        # Elbow angles (extension/flexion)
-        left_elbow_angle = calculate_angle(
-            get_landmark(landmarks["left_shoulder"]),
-            get_landmark(landmarks["left_elbow"]),
-            get_landmark(landmarks["left_wrist"])
-        )
-        right_elbow_angle = calculate_angle(
-            get_landmark(landmarks["right_shoulder"]),
-            get_landmark(landmarks["right_elbow"]),
-            get_landmark(landmarks["right_wrist"])
-        )
+    if frames is None:
+        frames = np.arange(len(landmarks))
+    kinematics_data = kinematics_arrays(landmarks)
+    
+    # Create a DataFrame from the kinematics data, preserving the column order
+    if metrics is None:
+        metrics = KINEMATICS_COLUMNS
+    kinematics_df = pd.DataFrame({column: kinematics_data[column] for column in KINEMATICS_COLUMNS if column in metrics})
+    
+    # Add a frame index column
+    kinematics_df.insert(0, "frame", list(frames))
+    if timestamps is not None:
+        kinematics_df.insert(1, "timestamp", list(timestamps))
+    
+    return kinematics_df
+
+
+def kinematics_arrays(landmarks: np.ndarray) -> dict:
+    """
+    Calculate every column of KINEMATICS_COLUMNS for (frames, 33, 3) landmarks,
+    returned as a dict of per-frame arrays (no DataFrame, so it is cheap
+    enough to run on single frames of a live session).
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    
+    def get_landmark(name):
+        return landmarks[:, LANDMARKS[name]]
+    
+    # Reference directions used as the third point of the "virtual" angles
+    up = np.array([0, -1, 0])
+    forward = np.array([1, 0, 0])
+    frontal_plane_normal = np.array([0, 0, 1])
+    
+    left_shoulder = get_landmark("left_shoulder")
+    right_shoulder = get_landmark("right_shoulder")
+    left_elbow = get_landmark("left_elbow")
+    right_elbow = get_landmark("right_elbow")
+    left_hip = get_landmark("left_hip")
+    right_hip = get_landmark("right_hip")
+    left_knee = get_landmark("left_knee")
+    right_knee = get_landmark("right_knee")
+    left_ankle = get_landmark("left_ankle")
+    right_ankle = get_landmark("right_ankle")
+    
+    # Degenerate frames (coincident points) produce NaN, as the per-frame code did
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kinematics_data = {
+            # Knee angles (extension/flexion)
+            "left_knee_angle": calculate_angles(left_hip, left_knee, left_ankle),
+            "right_knee_angle": calculate_angles(right_hip, right_knee, right_ankle),
+            # Hip angles (extension/flexion), using a vertical line from the hip as reference
+            "left_hip_angle": calculate_angles(left_hip + up, left_hip, left_knee),
+            "right_hip_angle": calculate_angles(right_hip + up, right_hip, right_knee),
+            # Ankle angles (dorsiflexion/plantarflexion), using a horizontal line from the ankle
+            "left_ankle_angle": calculate_angles(left_knee, left_ankle, left_ankle + forward),
+            "right_ankle_angle": calculate_angles(right_knee, right_ankle, right_ankle + forward),
+            # Shoulder angles (flexion/extension)
+            "left_shoulder_angle": calculate_angles(left_shoulder + up, left_shoulder, left_elbow),
+            "right_shoulder_angle": calculate_angles(right_shoulder + up, right_shoulder, right_elbow),
+            # Elbow angles (extension/flexion)
+            "left_elbow_angle": calculate_angles(left_shoulder, left_elbow, get_landmark("left_wrist")),
+            "right_elbow_angle": calculate_angles(right_shoulder, right_elbow, get_landmark("right_wrist")),
+        }
         
         # Trunk flexion (forward/backward lean)
-        left_hip = get_landmark(landmarks["left_hip"])
-        right_hip = get_landmark(landmarks["right_hip"])
         hip_center = (left_hip + right_hip) / 2
-        
-        left_shoulder = get_landmark(landmarks["left_shoulder"])
-        right_shoulder = get_landmark(landmarks["right_shoulder"])
         shoulder_center = (left_shoulder + right_shoulder) / 2
-        
-        # Create a vertical line from hip center
-        hip_vertical = hip_center + np.array([0, -1, 0])
-        
-        trunk_flexion = calculate_angle(
-            hip_vertical,
-            hip_center,
-            shoulder_center
-        )
+        kinematics_data["trunk_flexion"] = calculate_angles(hip_center + up, hip_center, shoulder_center)
         
         # Trunk lateral flexion (side bend)
-        # Create a line from left hip to right hip
-        hip_line = right_hip - left_hip
-        # Create a perpendicular line (up) from the hip line
-        hip_up = np.cross(hip_line, np.array([0, 0, 1]))
-        hip_up = hip_up / np.linalg.norm(hip_up)
+        # Perpendicular (up) to the hip line within the frontal plane
+        hip_up = np.cross(right_hip - left_hip, frontal_plane_normal)
+        hip_up = hip_up / np.linalg.norm(hip_up, axis=1, keepdims=True)
         
-        # Line from hip center to shoulder center
+        # Hip center to shoulder center, projected onto the frontal plane
         hip_to_shoulder = shoulder_center - hip_center
+        hip_to_shoulder_frontal = hip_to_shoulder - np.outer(hip_to_shoulder @ frontal_plane_normal, frontal_plane_normal)
+        kinematics_data["trunk_lateral_flexion"] = np.degrees(np.arccos(np.clip(
+            np.einsum("ij,ij->i", hip_up, hip_to_shoulder_frontal) / np.linalg.norm(hip_to_shoulder_frontal, axis=1),
+            -1.0, 1.0
+        )))
         
-        # Project hip_to_shoulder onto the frontal plane
-        frontal_plane_normal = np.array([0, 0, 1])
-        hip_to_shoulder_frontal = hip_to_shoulder - np.dot(hip_to_shoulder, frontal_plane_normal) * frontal_plane_normal
-        
-        # Calculate the angle between hip_up and hip_to_shoulder_frontal
-        trunk_lateral_flexion = np.degrees(np.arccos(
-            np.clip(np.dot(hip_up, hip_to_shoulder_frontal) / np.linalg.norm(hip_to_shoulder_frontal), -1.0, 1.0)
-        ))
-        
-        # Neck angles
-        neck = get_landmark(landmarks["neck"])
-        nose = get_landmark(landmarks["nose"])
-        
-        # Neck flexion
-        neck_vertical = neck + np.array([0, -1, 0])
-        neck_flexion = calculate_angle(
-            neck_vertical,
-            neck,
-            nose
-        )
+        # Neck flexion, with the neck approximated as the midpoint between the shoulders
+        neck = shoulder_center
+        kinematics_data["neck_flexion"] = calculate_angles(neck + up, neck, get_landmark("nose"))
         
-        # Neck lateral flexion
-        left_ear = get_landmark(landmarks["left_ear"])
-        right_ear = get_landmark(landmarks["right_ear"])
-        ear_center = (left_ear + right_ear) / 2
-        
-        # Create a vector from neck to ear center
+        # Neck lateral flexion: vertical vs. neck-to-ear-center projected onto the frontal plane
+        ear_center = (get_landmark("left_ear") + get_landmark("right_ear")) / 2
         neck_to_ear = ear_center - neck
-        
-        # Project neck_to_ear onto the frontal plane
-        neck_to_ear_frontal = neck_to_ear - np.dot(neck_to_ear, frontal_plane_normal) * frontal_plane_normal
-        
-        # Calculate the angle between vertical and neck_to_ear_frontal
-        neck_lateral_flexion = np.degrees(np.arccos(
-            np.clip(np.dot(np.array([0, -1, 0]), neck_to_ear_frontal) / np.linalg.norm(neck_to_ear_frontal), -1.0, 1.0)
-        ))
-        
-        # Calculate symmetry metrics (absolute difference between left and right)
-        knee_angle_symmetry = abs(left_knee_angle - right_knee_angle)
-        hip_angle_symmetry = abs(left_hip_angle - right_hip_angle)
-        shoulder_angle_symmetry = abs(left_shoulder_angle - right_shoulder_angle)
-        
-        # Store the calculated kinematics
-        kinematics_data["left_knee_angle"].append(left_knee_angle)
-        kinematics_data["right_knee_angle"].append(right_knee_angle)
-        kinematics_data["left_hip_angle"].append(left_hip_angle)
-        kinematics_data["right_hip_angle"].append(right_hip_angle)
-        kinematics_data["left_ankle_angle"].append(left_ankle_angle)
-        kinematics_data["right_ankle_angle"].append(right_ankle_angle)
-        kinematics_data["left_shoulder_angle"].append(left_shoulder_angle)
-        kinematics_data["right_shoulder_angle"].append(right_shoulder_angle)
-        kinematics_data["left_elbow_angle"].append(left_elbow_angle)
-        kinematics_data["right_elbow_angle"].append(right_elbow_angle)
-        kinematics_data["trunk_flexion"].append(trunk_flexion)
-        kinematics_data["trunk_lateral_flexion"].append(trunk_lateral_flexion)
-        kinematics_data["neck_flexion"].append(neck_flexion)
-        kinematics_data["neck_lateral_flexion"].append(neck_lateral_flexion)
-        kinematics_data["knee_angle_symmetry"].append(knee_angle_symmetry)
-        kinematics_data["hip_angle_symmetry"].append(hip_angle_symmetry)
-        kinematics_data["shoulder_angle_symmetry"].append(shoulder_angle_symmetry)
-    
-    # Create a DataFrame from the kinematics data
-    kinematics_df = pd.DataFrame(kinematics_data)
+        neck_to_ear_frontal = neck_to_ear - np.outer(neck_to_ear @ frontal_plane_normal, frontal_plane_normal)
+        kinematics_data["neck_lateral_flexion"] = np.degrees(np.arccos(np.clip(
+            (neck_to_ear_frontal @ up) / np.linalg.norm(neck_to_ear_frontal, axis=1),
+            -1.0, 1.0
+        )))
     
-    # Add a frame index column
-    kinematics_df.insert(0, "frame", list(frames_data.keys()))
+    # Calculate symmetry metrics (absolute difference between left and right)
+    kinematics_data["knee_angle_symmetry"] = np.abs(kinematics_data["left_knee_angle"] - kinematics_data["right_knee_angle"])
+    kinematics_data["hip_angle_symmetry"] = np.abs(kinematics_data["left_hip_angle"] - kinematics_data["right_hip_angle"])
+    kinematics_data["shoulder_angle_symmetry"] = np.abs(kinematics_data["left_shoulder_angle"] - kinematics_data["right_shoulder_angle"])
     
-    return kinematics_df
+    return kinematics_data
+
+
+def iter_pose_chunks(csv_file: str, metrics: List[str], dtype, chunk_size: int,
+                     camera: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a pose CSV, binary landmark store or session manifest in chunks of
+    at most chunk_size frames (a session's segments are read one after the other).
+    """
+    if is_session_manifest(csv_file):
+        for segment in session_segments(csv_file):
+            yield from iter_pose_chunks(segment, metrics, dtype, chunk_size, camera)
+    elif is_binary_landmark_file(csv_file):
+        yield from iter_landmark_chunks(csv_file, required_landmarks(metrics), chunk_size, camera)
+    else:
+        if camera is not None:
+            raise ValueError(f"{csv_file} holds a single camera, so no camera can be selected")
+        # The pyarrow engine cannot read in chunks, so always use the C parser here
+        # (with round_trip precision it parses exactly the same values)
+        read_options = csv_read_options(metrics, dtype, engine="c", time_columns=csv_time_columns(csv_file))
+        yield from pd.read_csv(csv_file, chunksize=chunk_size, **read_options)
+
+
+def stream_kinematics(csv_file: str, output_file: str, metrics: Optional[List[str]] = None,
+                       dtype=np.float64, chunk_size: int = 100_000, camera: Optional[str] = None) -> int:
+    """
+    Calculate kinematics for a pose CSV in fixed-size chunks, appending each
+    chunk's results to the output file so memory use does not grow with the
+    length of the recording. The output is identical to the batch mode.
+    
+    Args:
+        csv_file: Path to the pose CSV file
+        output_file: Path to the output kinematics CSV file
+        metrics: Kinematics columns to calculate (default: all)
+        dtype: Floating point type for the coordinate columns
+        chunk_size: Number of frames read and processed at a time
+        camera: View to read from a multi-camera store
+    
+    Returns the number of frames processed.
+    """
+    if metrics is None:
+        metrics = KINEMATICS_COLUMNS
+    
+    num_frames = 0
+    header_written = False
+    with open(output_file, "w", newline="") as output:
+        for chunk in iter_pose_chunks(csv_file, metrics, dtype, chunk_size, camera):
+            # Chunks keep a running row index, so frame numbers continue across chunks
+            if "frame" in chunk.columns:
+                chunk = chunk.set_index("frame")
+            chunk = chunk.astype({column: dtype for column in chunk.columns if column.startswith("landmark_")})
+            frame_index, landmarks = extract_landmark_coordinates(chunk)
+            kinematics_df = calculate_kinematics(landmarks, frame_index, metrics, extract_timestamps(chunk))
+            kinematics_df.to_csv(output, header=not header_written, index=False)
+            header_written = True
+            num_frames += len(chunk)
+        
+        if not header_written:
+            # Header-only input: still write the header, as the batch mode does
+            timestamps = [] if (is_binary_landmark_file(csv_file) or is_session_manifest(csv_file)
+                                or "timestamp" in csv_time_columns(csv_file)) else None
+            calculate_kinematics(np.empty((0, NUM_LANDMARKS, 3)), [], metrics, timestamps).to_csv(output, index=False)
+    
+    return num_frames
 
 
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Calculate clinical kinematics from pose data")
-    parser.add_argument("input_csv", help="Path to the input CSV file containing pose data")
+    parser.add_argument("input_csv", help="Path to the input file containing pose data "
+                        "(.csv, a .parquet/.npz/.h5 landmark store, or a .session.json of recorded segments)")
     parser.add_argument("--output", "-o", help="Path to the output CSV file (default: 'clinical_kinematics.csv')", 
                         default="clinical_kinematics.csv")
+    parser.add_argument("--metrics", help="Comma-separated kinematics columns to calculate (default: all); "
+                        "only the landmark columns they need are read from the input")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float64",
+                        help="Floating point type used when reading landmark coordinates (default: float64)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Process the input in fixed-size chunks with bounded memory (for very large files)")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="Frames per chunk in --stream mode (default: 100000)")
+    parser.add_argument("--camera", help="View to analyze in a multi-camera store from motion_extract_multicam.py, "
+                        "e.g. sagittal")
     args = parser.parse_args()
     
-    # Parse the input CSV file
-    pose_df = parse_pose_csv(args.input_csv)
+    metrics = KINEMATICS_COLUMNS
+    if args.metrics:
+        metrics = [metric.strip() for metric in args.metrics.split(",")]
+        unknown = [metric for metric in metrics if metric not in METRIC_LANDMARKS]
+        if unknown:
+            parser.error(f"unknown metric(s): {', '.join(unknown)}")
+    
+    if args.stream:
+        try:
+            num_frames = stream_kinematics(args.input_csv, args.output, metrics, np.dtype(args.dtype), args.chunk_size,
+                                           args.camera)
+            print(f"Clinical kinematics data for {num_frames} frames saved to {args.output}")
+        except Exception as e:
+            print(f"Error processing pose data: {e}")
+        return
+    
+    # Parse the input CSV file, reading only the landmarks the metrics need
+    pose_df = parse_pose_csv(args.input_csv, metrics=metrics, dtype=np.dtype(args.dtype), camera=args.camera)
     if pose_df is None:
         return
     
     # Extract landmark coordinates
-    frames_data = extract_landmark_coordinates(pose_df)
+    frame_index, landmarks = extract_landmark_coordinates(pose_df)
     
     # Calculate kinematics
-    kinematics_df = calculate_kinematics(frames_data)
+    kinematics_df = calculate_kinematics(landmarks, frame_index, metrics, extract_timestamps(pose_df))
     
     # Save the kinematics data to a CSV file
     try:
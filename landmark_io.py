@@ -0,0 +1,1040 @@
+import csv
+import glob
+import io
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import zipfile
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# MediaPipe Pose has 33 landmarks, stored as landmark_{i}_{x,y,z} columns
+NUM_LANDMARKS = 33
+LANDMARK_COLUMNS = [f"landmark_{i}_{axis}" for i in range(NUM_LANDMARKS) for axis in ("x", "y", "z")]
+
+# MediaPipe's per-landmark visibility, stored after the coordinates as landmark_{i}_visibility columns
+VISIBILITY_COLUMNS = [f"landmark_{i}_visibility" for i in range(NUM_LANDMARKS)]
+
+# Optional leading CSV columns with the source frame index and timestamp (seconds) of each row
+TIME_COLUMNS = ["frame", "timestamp"]
+
+# Supported landmark file formats, selected by file extension
+CSV_EXTENSIONS = (".csv",)
+BINARY_EXTENSIONS = (".parquet", ".npz", ".h5", ".hdf5")
+
+# Key under which capture metadata is stored in the binary formats
+METADATA_KEY = "motion_quantification"
+
+# Suffix of the directory holding the part files of an unfinished .parquet/.npz
+PARTS_SUFFIX = ".parts"
+
+# Frames per row group when the .parquet parts are merged (bounds merge memory)
+MERGE_ROW_GROUP_FRAMES = 65536
+
+# Suffix of the manifest tying the segment files of a rotated recording into one session
+SESSION_SUFFIX = ".session.json"
+
+# Arrays of a multi-camera store besides the metadata (see save_multicam_landmarks)
+MULTICAM_ARRAYS = ("frame", "timestamp", "landmarks", "source_frame", "source_timestamp")
+
+# Values kept per landmark in memory: x, y, z and visibility
+LANDMARK_VALUES = 4
+
+
+def landmark_format(filename: str) -> str:
+    """
+    Return the landmark file format ("csv", "parquet", "npz" or "h5") for a file name.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CSV_EXTENSIONS:
+        return "csv"
+    if extension == ".parquet":
+        return "parquet"
+    if extension == ".npz":
+        return "npz"
+    if extension in (".h5", ".hdf5"):
+        return "h5"
+    raise ValueError(f"Unsupported landmark file extension '{extension}' "
+                     f"(expected one of: {', '.join(CSV_EXTENSIONS + BINARY_EXTENSIONS)})")
+
+
+def is_session_manifest(filename: str) -> bool:
+    """
+    Return True if the file name is a session manifest written by SegmentedLandmarkWriter.
+    """
+    return filename.lower().endswith(SESSION_SUFFIX)
+
+
+def load_session_manifest(filename: str) -> dict:
+    """
+    Read a session manifest: the session's metadata and its segments in order,
+    each with its file name (relative to the manifest), frame range, number
+    of frames and whether it was completed.
+    """
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def session_segments(filename: str) -> List[str]:
+    """
+    Return the paths of a session's segment files, in recording order.
+    """
+    manifest = load_session_manifest(filename)
+    directory = os.path.dirname(os.path.abspath(filename))
+    segments = [os.path.join(directory, segment["file"]) for segment in manifest["segments"]]
+    if not segments:
+        raise ValueError(f"Session {filename} has no segments")
+    return segments
+
+
+def is_binary_landmark_file(filename: str) -> bool:
+    """
+    Return True if the file name has one of the binary landmark store extensions.
+    """
+    return os.path.splitext(filename)[1].lower() in BINARY_EXTENSIONS
+
+
+def landmarks_to_array(landmarks, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert MediaPipe pose landmarks (results.pose_landmarks) into a (33, 4)
+    float32 array of x, y, z and visibility, written into `out` if given.
+    """
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, LANDMARK_VALUES), dtype=np.float32)
+    out[:] = [(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in landmarks.landmark]
+    return out
+
+
+class LandmarkBuffer:
+    """
+    Growable in-memory store of per-frame landmarks: a preallocated
+    (capacity, 33, 4) float32 array of x, y, z and visibility plus the frame
+    index and timestamp of each row. The capacity doubles when it is full, and
+    clear() empties the buffer without releasing the arrays. Frames without a
+    detected pose are stored as rows of NaN.
+    """
+
+    def __init__(self, capacity: int = 256):
+        """
+        Args:
+            capacity: Number of frames preallocated
+        """
+        capacity = max(1, capacity)
+        self.data = np.empty((capacity, NUM_LANDMARKS, LANDMARK_VALUES), dtype=np.float32)
+        self.frame_data = np.empty(capacity, dtype=np.int64)
+        self.timestamp_data = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def landmarks(self) -> np.ndarray:
+        """
+        (frames, 33, 4) view of the stored landmarks.
+        """
+        return self.data[:self.size]
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self.frame_data[:self.size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.timestamp_data[:self.size]
+
+    def append(self, landmarks, frame: int, timestamp: float = float("nan")) -> np.ndarray:
+        """
+        Append one frame and return its (33, 4) row (a view into the buffer).
+
+        Args:
+            landmarks: MediaPipe pose landmarks (results.pose_landmarks), a
+                (33, 4) or (33, 3) array or 33 (x, y, z) tuples; visibility is
+                NaN when it is not given. None (no pose detected) stores a NaN row
+            frame: Source frame index
+            timestamp: Timestamp in seconds
+        """
+        if self.size == len(self.data):
+            self.grow(2 * len(self.data))
+
+        row = self.data[self.size]
+        if landmarks is None:
+            row[:] = np.nan
+        elif hasattr(landmarks, "SerializeToString"):
+            landmarks_to_array(landmarks, row)
+        else:
+            values = np.asarray(landmarks, dtype=np.float32)
+            row[:, :values.shape[1]] = values
+            row[:, values.shape[1]:] = np.nan
+        self.frame_data[self.size] = frame
+        self.timestamp_data[self.size] = timestamp
+        self.size += 1
+        return row
+
+    def grow(self, capacity: int):
+        """
+        Reallocate the arrays with room for `capacity` frames, keeping the stored rows.
+        """
+        for name in ("data", "frame_data", "timestamp_data"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def clear(self):
+        """
+        Drop the stored frames, keeping the allocated arrays for reuse.
+        """
+        self.size = 0
+
+
+def save_landmarks(landmarks_history, filename: str, frames: Optional[Sequence[int]] = None,
+                   timestamps: Optional[Sequence[float]] = None, metadata: Optional[dict] = None,
+                   verbose: bool = True):
+    """
+    Save pose landmarks history to a file, choosing the format from the extension.
+
+    .csv writes one text row per frame with the source frame index, the
+    timestamp and the x, y, z coordinates of every landmark, in the layout of
+    LandmarkWriter. .parquet, .npz and .h5 write a compact binary store holding
+    the landmarks as float32 (the precision MediaPipe produces them in), the
+    source frame index, the timestamp in seconds and the capture metadata.
+    Given (frames, 33, 4) landmarks, every format stores the visibility of
+    every landmark as well.
+
+    Args:
+        landmarks_history: Per-frame lists of 33 (x, y, z) tuples, or an array of shape
+            (frames, 33, 3) or (frames, 33, 4)
+        filename: Output file path
+        frames: Source frame index of each row (default: 0..N-1)
+        timestamps: Timestamp of each row in seconds (default: NaN)
+        metadata: Capture metadata (fps, resolution, model settings, ...) stored with binary formats
+        verbose: Print a message once the file is saved
+    """
+    file_format = landmark_format(filename)
+    landmarks = np.asarray(landmarks_history, dtype=np.float32)
+    visibility = None
+    if landmarks.ndim == 3 and landmarks.shape[2] == LANDMARK_VALUES:
+        visibility = np.ascontiguousarray(landmarks[:, :, 3])
+        landmarks = np.ascontiguousarray(landmarks[:, :, :3])
+    landmarks = landmarks.reshape(-1, NUM_LANDMARKS, 3)
+    num_frames = len(landmarks)
+    frames = np.arange(num_frames, dtype=np.int64) if frames is None else np.asarray(frames, dtype=np.int64)
+    timestamps = np.full(num_frames, np.nan) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+    metadata_json = json.dumps(metadata or {})
+
+    if file_format == "csv":
+        header = TIME_COLUMNS + LANDMARK_COLUMNS
+        values = landmarks.reshape(num_frames, len(LANDMARK_COLUMNS))
+        if visibility is not None:
+            header = header + VISIBILITY_COLUMNS
+            values = np.concatenate([values, visibility], axis=1)
+        with open(filename, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            # Python floats, so the float32 values are written exactly
+            for frame, timestamp, row in zip(frames.tolist(), timestamps.tolist(),
+                                             values.astype(np.float64).tolist()):
+                writer.writerow([frame, timestamp] + row)
+    elif file_format == "parquet":
+        pa, pq = import_pyarrow()
+        columns = {"frame": frames, "timestamp": timestamps}
+        flat = landmarks.reshape(num_frames, len(LANDMARK_COLUMNS))
+        for i, column in enumerate(LANDMARK_COLUMNS):
+            columns[column] = flat[:, i]
+        if visibility is not None:
+            for i, column in enumerate(VISIBILITY_COLUMNS):
+                columns[column] = visibility[:, i]
+        table = pa.table(columns).replace_schema_metadata({METADATA_KEY: metadata_json})
+        pq.write_table(table, filename, compression="zstd")
+    elif file_format == "npz":
+        arrays = {} if visibility is None else {"visibility": visibility}
+        np.savez_compressed(filename, frame=frames, timestamp=timestamps, landmarks=landmarks,
+                            metadata=np.array(metadata_json), **arrays)
+    else:
+        h5py = import_h5py()
+        with h5py.File(filename, "w") as store:
+            store.create_dataset("frame", data=frames, compression="lzf")
+            store.create_dataset("timestamp", data=timestamps, compression="lzf")
+            store.create_dataset("landmarks", data=landmarks, compression="lzf",
+                                 chunks=(min(num_frames, 4096), NUM_LANDMARKS, 3) if num_frames else None)
+            if visibility is not None:
+                store.create_dataset("visibility", data=visibility, compression="lzf",
+                                     chunks=(min(num_frames, 4096), NUM_LANDMARKS) if num_frames else None)
+            store.attrs[METADATA_KEY] = metadata_json
+
+    if verbose:
+        print(f"Data saved to {filename}")
+
+
+def save_multicam_landmarks(filename: str, cameras: Sequence[str], timestamps: np.ndarray, landmarks: np.ndarray,
+                            source_frames: np.ndarray, source_timestamps: np.ndarray,
+                            metadata: Optional[dict] = None, verbose: bool = True):
+    """
+    Save time-aligned landmarks of several cameras to a .npz or .h5 store.
+
+    Row i of every array is one instant of the common timeline. "landmarks"
+    has a camera axis, shape (frames, cameras, 33, 4) with x, y, z and
+    visibility, and is NaN where a camera has no pose at that instant. Its
+    source_frame is -1 where the camera has no frame at that instant at all.
+    The camera names are stored in the metadata.
+
+    Args:
+        filename: Output file path (.npz or .h5)
+        cameras: Name of each camera, in the order of the camera axis
+        timestamps: (frames,) common timestamps in seconds
+        landmarks: (frames, cameras, 33, 4) landmarks
+        source_frames: (frames, cameras) frame index in each camera's own recording, -1 where missing
+        source_timestamps: (frames, cameras) timestamp of that frame in the camera's own recording
+        metadata: Capture metadata of the session
+        verbose: Print a message once the file is saved
+    """
+    file_format = landmark_format(filename)
+    if file_format not in ("npz", "h5"):
+        raise ValueError(f"Multi-camera landmarks are saved as .npz or .h5, not .{file_format}")
+
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    num_frames = len(landmarks)
+    frames = np.arange(num_frames, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    source_frames = np.asarray(source_frames, dtype=np.int64)
+    source_timestamps = np.asarray(source_timestamps, dtype=np.float64)
+    metadata_json = json.dumps(dict(metadata or {}, cameras=list(cameras)))
+
+    if file_format == "npz":
+        np.savez_compressed(filename, frame=frames, timestamp=timestamps, landmarks=landmarks,
+                            source_frame=source_frames, source_timestamp=source_timestamps,
+                            metadata=np.array(metadata_json))
+    else:
+        h5py = import_h5py()
+        with h5py.File(filename, "w") as store:
+            store.create_dataset("frame", data=frames, compression="lzf")
+            store.create_dataset("timestamp", data=timestamps, compression="lzf")
+            store.create_dataset("source_frame", data=source_frames, compression="lzf")
+            store.create_dataset("source_timestamp", data=source_timestamps, compression="lzf")
+            store.create_dataset("landmarks", data=landmarks, compression="lzf",
+                                 chunks=(min(num_frames, 1024),) + landmarks.shape[1:] if num_frames else None)
+            store.attrs[METADATA_KEY] = metadata_json
+
+    if verbose:
+        print(f"Data saved to {filename}")
+
+
+def load_multicam_landmarks(filename: str) -> dict:
+    """
+    Load a multi-camera store written by save_multicam_landmarks.
+
+    Returns a dict with the camera names ("cameras"), the capture metadata
+    ("metadata") and the "frame", "timestamp", "landmarks", "source_frame"
+    and "source_timestamp" arrays.
+    """
+    file_format = landmark_format(filename)
+    if file_format == "npz":
+        with np.load(filename) as store:
+            arrays = {name: store[name] for name in MULTICAM_ARRAYS}
+            metadata = json.loads(str(store["metadata"]))
+    elif file_format == "h5":
+        h5py = import_h5py()
+        with h5py.File(filename, "r") as store:
+            arrays = {name: store[name][()] for name in MULTICAM_ARRAYS}
+            metadata = json.loads(store.attrs.get(METADATA_KEY, "{}"))
+    else:
+        raise ValueError(f"{filename} is not a multi-camera landmark store (.npz or .h5)")
+    if arrays["landmarks"].ndim != 4:
+        raise ValueError(f"{filename} holds a single camera; read it with load_landmarks")
+
+    return dict(arrays, cameras=metadata.get("cameras", []), metadata=metadata)
+
+
+def load_landmarks(filename: str, landmark_indices: Optional[Sequence[int]] = None,
+                   camera: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a binary landmark store (.parquet, .npz or .h5) written by save_landmarks,
+    or a session manifest of binary segments (read as one recording).
+
+    Returns a DataFrame with the landmark_{i}_{x,y,z} columns (followed by the
+    landmark_{i}_visibility columns when the store has them), indexed by source
+    frame, with the timestamps in a "timestamp" column and the capture metadata
+    in df.attrs["metadata"]. Frames where no pose was detected are rows of NaN.
+
+    Args:
+        filename: Path to the landmark store
+        landmark_indices: Only load these landmarks (default: all 33)
+        camera: View to load from a multi-camera store (see save_multicam_landmarks);
+            rows are then the instants of the common timeline where that camera has a frame
+    """
+    chunks = list(iter_landmark_chunks(filename, landmark_indices, chunk_size=None, camera=camera))
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+    df.attrs["metadata"] = chunks[0].attrs["metadata"]
+
+    return df
+
+
+def iter_landmark_chunks(filename: str, landmark_indices: Optional[Sequence[int]] = None,
+                         chunk_size: Optional[int] = 100_000, camera: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a binary landmark store in chunks of at most chunk_size frames
+    (None reads everything at once). Each chunk is a DataFrame in the same
+    layout as load_landmarks returns; at least one chunk is always yielded.
+    Multi-camera stores need the camera to read (see load_landmarks).
+    """
+    if landmark_indices is None:
+        landmark_indices = range(NUM_LANDMARKS)
+    landmark_indices = sorted(landmark_indices)
+    columns = [f"landmark_{i}_{axis}" for i in landmark_indices for axis in ("x", "y", "z")]
+    visibility_columns = [VISIBILITY_COLUMNS[i] for i in landmark_indices]
+
+    if is_session_manifest(filename):
+        # Rotated recording: the segments in order form one session
+        for segment in session_segments(filename):
+            yield from iter_landmark_chunks(segment, landmark_indices, chunk_size, camera)
+        return
+
+    parts_dir = filename + PARTS_SUFFIX
+    if not os.path.exists(filename) and os.path.isdir(parts_dir):
+        # Unfinished streaming output (e.g. after a crash): read the parts in order
+        yield from iter_parts_chunks(parts_dir, landmark_indices, chunk_size)
+        return
+
+    file_format = landmark_format(filename)
+    if camera is not None and file_format not in ("npz", "h5"):
+        raise ValueError(f"{filename} holds a single camera, so no camera can be selected")
+    if file_format == "parquet":
+        _, pq = import_pyarrow()
+        parquet_file = pq.ParquetFile(filename)
+        schema_metadata = parquet_file.schema_arrow.metadata or {}
+        metadata = json.loads(schema_metadata.get(METADATA_KEY.encode(), b"{}").decode())
+        read_columns = ["frame", "timestamp"] + columns
+        if set(visibility_columns) <= set(parquet_file.schema_arrow.names):
+            read_columns += visibility_columns
+        if chunk_size is None:
+            batches = [parquet_file.read(columns=read_columns)]
+        else:
+            batches = parquet_file.iter_batches(batch_size=chunk_size, columns=read_columns)
+        yielded = False
+        for batch in batches:
+            yield with_metadata(batch.to_pandas().set_index("frame"), metadata)
+            yielded = True
+        if not yielded:
+            # Empty store: keep the column layout and dtypes
+            empty_table = parquet_file.schema_arrow.empty_table().select(read_columns)
+            yield with_metadata(empty_table.to_pandas().set_index("frame"), metadata)
+    elif file_format == "npz":
+        # Compressed .npz members can only be read whole; chunking just bounds
+        # the size of the DataFrames built from them
+        with np.load(filename) as store:
+            metadata = json.loads(str(store["metadata"]))
+            # Every access to an .npz member decompresses it again, so load them once
+            arrays = {name: store[name] for name in store.files if name != "metadata"}
+            yield from iter_store_chunks(filename, arrays, landmark_indices, columns, metadata, chunk_size, camera)
+    elif file_format == "h5":
+        h5py = import_h5py()
+        # SWMR read mode also opens files whose writer was interrupted
+        with h5py.File(filename, "r", swmr=True) as store:
+            metadata = json.loads(store.attrs.get(METADATA_KEY, "{}"))
+            yield from iter_store_chunks(filename, store, landmark_indices, columns, metadata, chunk_size, camera)
+    else:
+        raise ValueError(f"{filename} is not a binary landmark store")
+
+
+def iter_store_chunks(filename: str, store, landmark_indices: List[int], columns: List[str], metadata: dict,
+                      chunk_size: Optional[int], camera: Optional[str]) -> Iterator[pd.DataFrame]:
+    """
+    Read the landmark chunks of an .npz store's arrays or an open .h5 store. For a multi-camera
+    store, only the instants where the selected camera has a frame are read.
+    """
+    if store["landmarks"].ndim != 4:
+        if camera is not None:
+            raise ValueError(f"{filename} holds a single camera, so no camera can be selected")
+        visibility = store["visibility"] if "visibility" in store else None
+        yield from iter_array_chunks(store["landmarks"], store["frame"], store["timestamp"],
+                                     landmark_indices, columns, metadata, chunk_size, visibility)
+        return
+
+    cameras = metadata.get("cameras", [])
+    if camera not in cameras:
+        raise ValueError(f"{filename} holds several cameras ({', '.join(cameras)}); select one of them"
+                         if camera is None else f"{filename} has no camera '{camera}' ({', '.join(cameras)})")
+    position = cameras.index(camera)
+    metadata = dict(metadata, camera=camera)
+
+    num_frames = len(store["frame"])
+    step = max(num_frames, 1) if chunk_size is None else chunk_size
+    for start in range(0, max(num_frames, 1), step):
+        stop = min(start + step, num_frames)
+        # Instants outside the camera's recording are left out; those where it saw
+        # no pose stay as NaN rows, as in a single-camera store
+        present = np.asarray(store["source_frame"][start:stop, position]) >= 0
+        landmarks = np.asarray(store["landmarks"][start:stop, position])[present]
+        yield from iter_array_chunks(landmarks[:, :, :3], np.asarray(store["frame"][start:stop])[present],
+                                     np.asarray(store["timestamp"][start:stop])[present],
+                                     landmark_indices, columns, metadata, None, landmarks[:, :, 3])
+
+
+def iter_parts_chunks(parts_dir: str, landmark_indices: Optional[Sequence[int]],
+                      chunk_size: Optional[int]) -> Iterator[pd.DataFrame]:
+    """
+    Read the part files written by LandmarkWriter for a .parquet/.npz output, in order.
+    """
+    part_files = sorted(glob.glob(os.path.join(parts_dir, "part-*")))
+    if not part_files:
+        raise ValueError(f"{parts_dir} contains no landmark parts")
+    for part_file in part_files:
+        yield from iter_landmark_chunks(part_file, landmark_indices, chunk_size)
+
+
+def iter_array_chunks(landmarks, frames, timestamps, landmark_indices: List[int], columns: List[str],
+                      metadata: dict, chunk_size: Optional[int], visibility=None) -> Iterator[pd.DataFrame]:
+    """
+    Slice (frames, 33, 3) landmark arrays and optional (frames, 33) visibility
+    (NumPy arrays or HDF5 datasets) into DataFrame chunks; HDF5 datasets are
+    only read one chunk at a time.
+    """
+    num_frames = len(frames)
+    step = max(num_frames, 1) if chunk_size is None else chunk_size
+    for start in range(0, max(num_frames, 1), step):
+        stop = min(start + step, num_frames)
+        chunk = np.asarray(landmarks[start:stop])[:, landmark_indices, :]
+        values = chunk.reshape(len(chunk), len(columns))
+        chunk_columns = columns
+        if visibility is not None:
+            values = np.concatenate([values, np.asarray(visibility[start:stop])[:, landmark_indices]], axis=1)
+            chunk_columns = columns + [VISIBILITY_COLUMNS[i] for i in landmark_indices]
+        df = pd.DataFrame(values, columns=chunk_columns)
+        df.insert(0, "frame", np.asarray(frames[start:stop]))
+        df.insert(1, "timestamp", np.asarray(timestamps[start:stop]))
+        yield with_metadata(df.set_index("frame"), metadata)
+
+
+def frame_landmarks(df: pd.DataFrame) -> np.ndarray:
+    """
+    The (frames, 33, 4) landmarks of a DataFrame read by load_landmarks; visibility
+    is NaN when the store has none.
+    """
+    landmarks = np.full((len(df), NUM_LANDMARKS, LANDMARK_VALUES), np.nan, dtype=np.float32)
+    landmarks[:, :, :3] = df[LANDMARK_COLUMNS].to_numpy(dtype=np.float32).reshape(len(df), NUM_LANDMARKS, 3)
+    if set(VISIBILITY_COLUMNS) <= set(df.columns):
+        landmarks[:, :, 3] = df[VISIBILITY_COLUMNS].to_numpy(dtype=np.float32)
+    return landmarks
+
+
+def with_metadata(df: pd.DataFrame, metadata: dict) -> pd.DataFrame:
+    """
+    Attach capture metadata to a landmark DataFrame (as df.attrs["metadata"]).
+    """
+    df.attrs["metadata"] = metadata
+    return df
+
+
+def import_pyarrow():
+    """
+    Import pyarrow and pyarrow.parquet, with a helpful error if they are missing.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet landmark files require pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+def import_h5py():
+    """
+    Import h5py, with a helpful error if it is missing.
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("HDF5 landmark files require h5py (pip install h5py)")
+    return h5py
+
+
+def merge_parquet_parts(part_files: List[str], filename: str, metadata: dict):
+    """
+    Concatenate the .parquet part files of a LandmarkWriter into `filename`,
+    holding at most one row group of MERGE_ROW_GROUP_FRAMES frames in memory.
+    """
+    pa, pq = import_pyarrow()
+    temp_file = filename + ".tmp"
+    writer = None
+    pending = []
+    pending_frames = 0
+    try:
+        for part_file in part_files:
+            table = pq.read_table(part_file)
+            table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata)})
+            if writer is None:
+                writer = pq.ParquetWriter(temp_file, table.schema, compression="zstd")
+            pending.append(table)
+            pending_frames += table.num_rows
+            # Parts are small, and the writer keeps every row group's metadata until
+            # it closes, so parts are gathered into row groups of a fixed size
+            if pending_frames >= MERGE_ROW_GROUP_FRAMES:
+                writer.write_table(pa.concat_tables(pending))
+                pending = []
+                pending_frames = 0
+        if pending:
+            writer.write_table(pa.concat_tables(pending))
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(temp_file, filename)
+
+
+def merge_npz_parts(part_files: List[str], filename: str, metadata: dict):
+    """
+    Concatenate the .npz part files of a LandmarkWriter into `filename`.
+
+    np.savez_compressed needs every array in memory, so the .npy members are
+    written into the zip archive directly: the header is sized for the total
+    number of frames, then each part's rows are appended, one part and one
+    member at a time.
+    """
+    shapes = {}
+    num_frames = 0
+    for part_file in part_files:
+        with np.load(part_file) as part:
+            num_frames += len(part["frame"])
+            if not shapes:
+                shapes = {name: part[name][:0] for name in part.files if name != "metadata"}
+
+    temp_file = filename + ".tmp"
+    with zipfile.ZipFile(temp_file, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for name, empty in shapes.items():
+            header = {
+                "descr": np.lib.format.dtype_to_descr(empty.dtype),
+                "fortran_order": False,
+                "shape": (num_frames,) + empty.shape[1:],
+            }
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array_header_2_0(member, header)
+                for part_file in part_files:
+                    with np.load(part_file) as part:
+                        member.write(np.ascontiguousarray(part[name], dtype=empty.dtype).tobytes())
+        with archive.open("metadata.npy", "w") as member:
+            np.lib.format.write_array(member, np.array(json.dumps(metadata)))
+    os.replace(temp_file, filename)
+
+
+class LandmarkWriter:
+    """
+    Streaming landmark writer: frames are appended as they are produced and
+    written to disk in batches, so memory use stays bounded and a crash loses
+    at most the frames since the last flush. Files that were only partially
+    written stay readable with load_landmarks / parse_pose_csv:
+
+    - .csv: rows are appended to the file, each starting with its frame index
+      and timestamp.
+    - .h5: rows are appended to resizable datasets in SWMR mode.
+    - .parquet / .npz: these formats cannot be appended to, so each batch is
+      written as a complete part file in <filename>.parts/, and the parts are
+      merged into <filename> when the writer is closed.
+
+    Every format stores the visibility of each landmark next to its
+    coordinates, and frames appended without a pose are written as NaN rows.
+    Nothing is created until the first frame is appended. With keep_frames,
+    an interrupted output is continued instead (see restore).
+    """
+
+    def __init__(self, filename: str, metadata: Optional[dict] = None, batch_size: int = 256,
+                 flush_interval: float = 5.0, keep_frames: int = 0):
+        """
+        Args:
+            filename: Output file path; the extension selects the format
+            metadata: Capture metadata stored with binary formats
+            batch_size: Frames buffered in memory before they are written
+            flush_interval: Maximum seconds between flushes (and fsyncs) to disk
+            keep_frames: Continue an interrupted output after its first keep_frames
+                frames (0 starts a new file)
+        """
+        self.filename = filename
+        self.file_format = landmark_format(filename)
+        self.metadata = metadata or {}
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.frames_written = 0
+        self.parts_written = 0
+        self.buffer = LandmarkBuffer(batch_size)
+        self.last_flush = time.monotonic()
+        self.file = None
+        self.store = None
+        self.closed = False
+        if keep_frames:
+            self.restore(keep_frames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def frame_count(self) -> int:
+        """
+        Number of frames appended so far (written or still buffered).
+        """
+        return self.frames_written + len(self.buffer)
+
+    def restore(self, keep_frames: int):
+        """
+        Continue an interrupted output: keep its first keep_frames frames and
+        discard anything written after them (e.g. a partial last row), so the
+        next append follows the kept frames.
+
+        A CSV is truncated in place. Binary outputs (the file, or the part
+        files of an unfinished .parquet/.npz) are moved aside and their kept
+        frames written again, since they cannot be truncated.
+        """
+        if self.file_format == "csv":
+            with open(self.filename, "rb+") as f:
+                f.readline()
+                for _ in range(keep_frames):
+                    if not f.readline().endswith(b"\n"):
+                        raise ValueError(f"{self.filename} has fewer than {keep_frames} complete rows")
+                f.truncate(f.tell())
+            self.file = open(self.filename, "a", newline="")
+            self.frames_written = keep_frames
+            return
+
+        stem, extension = os.path.splitext(self.filename)
+        parts_dir = self.filename + PARTS_SUFFIX
+        aside_file = f"{stem}.interrupted{extension}"
+        aside_parts = aside_file + PARTS_SUFFIX
+        # An earlier restore that was itself interrupted left the original aside
+        if not (os.path.exists(aside_file) or os.path.isdir(aside_parts)):
+            if os.path.isdir(parts_dir):
+                # A merge that did not finish may have left a partial output next to the parts
+                os.replace(parts_dir, aside_parts)
+            else:
+                os.replace(self.filename, aside_file)
+        if os.path.isdir(parts_dir):
+            shutil.rmtree(parts_dir)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+        if os.path.isdir(aside_parts):
+            chunks = iter_parts_chunks(aside_parts, None, self.batch_size)
+        else:
+            chunks = iter_landmark_chunks(aside_file, chunk_size=self.batch_size)
+        remaining = keep_frames
+        for chunk in chunks:
+            chunk = chunk.iloc[:remaining]
+            landmarks = frame_landmarks(chunk)
+            for row, frame, timestamp in zip(landmarks, chunk.index, chunk["timestamp"]):
+                self.buffer.append(row, frame, timestamp)
+            self.flush()
+            remaining -= len(chunk)
+            if not remaining:
+                break
+        if remaining:
+            raise ValueError(f"{self.filename} has fewer than {keep_frames} frames")
+
+        if os.path.isdir(aside_parts):
+            shutil.rmtree(aside_parts)
+        else:
+            os.remove(aside_file)
+
+    def append(self, landmarks, frame: int, timestamp: float = float("nan")) -> np.ndarray:
+        """
+        Append one frame: MediaPipe pose landmarks (or 33 (x, y, z) tuples, or
+        a (33, 3) / (33, 4) array, or None for a frame without a pose), its
+        source frame index and timestamp in seconds.
+
+        Returns the frame's (33, 4) row of x, y, z and visibility. The row is a
+        view into the batch buffer, valid until the next append.
+        """
+        row = self.buffer.append(landmarks, frame, timestamp)
+        if (len(self.buffer) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+        return row
+
+    def flush(self):
+        """
+        Write the buffered frames and fsync them to disk.
+        """
+        self.last_flush = time.monotonic()
+        if not len(self.buffer):
+            return
+
+        if self.file_format == "csv":
+            self.write_csv_batch()
+        elif self.file_format == "h5":
+            self.write_h5_batch()
+        else:
+            self.write_part()
+
+        self.frames_written += len(self.buffer)
+        # Only the size is reset, so rows returned by append stay readable until the next one
+        self.buffer.clear()
+
+    def write_csv_batch(self):
+        """
+        Append the buffered frames to the CSV file as complete rows.
+        """
+        if self.file is None:
+            self.file = open(self.filename, "w", newline="")
+            csv.writer(self.file).writerow(TIME_COLUMNS + LANDMARK_COLUMNS + VISIBILITY_COLUMNS)
+
+        # Format the whole batch first so it reaches the file in one write
+        text = io.StringIO()
+        writer = csv.writer(text)
+        # Python floats, so the values are written exactly as MediaPipe's (float32) coordinates
+        landmarks = self.buffer.landmarks
+        rows = np.concatenate([landmarks[:, :, :3].reshape(len(landmarks), -1), landmarks[:, :, 3]],
+                              axis=1).astype(np.float64).tolist()
+        for row, frame, timestamp in zip(rows, self.buffer.frames.tolist(), self.buffer.timestamps.tolist()):
+            writer.writerow([frame, timestamp] + row)
+        self.file.write(text.getvalue())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def write_h5_batch(self):
+        """
+        Append the buffered frames to the resizable HDF5 datasets.
+        """
+        landmarks = self.buffer.landmarks
+        if self.store is None:
+            h5py = import_h5py()
+            self.store = h5py.File(self.filename, "w", libver="latest")
+            self.store.create_dataset("frame", shape=(0,), maxshape=(None,), dtype=np.int64, chunks=(4096,))
+            self.store.create_dataset("timestamp", shape=(0,), maxshape=(None,), dtype=np.float64, chunks=(4096,))
+            self.store.create_dataset("landmarks", shape=(0, NUM_LANDMARKS, 3), maxshape=(None, NUM_LANDMARKS, 3),
+                                      dtype=np.float32, chunks=(256, NUM_LANDMARKS, 3), compression="lzf")
+            self.store.create_dataset("visibility", shape=(0, NUM_LANDMARKS), maxshape=(None, NUM_LANDMARKS),
+                                      dtype=np.float32, chunks=(256, NUM_LANDMARKS), compression="lzf")
+            self.store.attrs[METADATA_KEY] = json.dumps(self.metadata)
+            # Single-writer/multiple-reader mode keeps the file consistent between flushes
+            self.store.swmr_mode = True
+
+        start = self.frames_written
+        stop = start + len(landmarks)
+        for name, values in (("frame", self.buffer.frames), ("timestamp", self.buffer.timestamps),
+                             ("landmarks", landmarks[:, :, :3]), ("visibility", landmarks[:, :, 3])):
+            dataset = self.store[name]
+            dataset.resize(stop, axis=0)
+            dataset[start:stop] = values
+        self.store.flush()
+        os.fsync(self.store.id.get_vfd_handle())
+
+    def write_part(self):
+        """
+        Write the buffered frames as the next complete part file of a .parquet/.npz output.
+        """
+        parts_dir = self.filename + PARTS_SUFFIX
+        if self.parts_written == 0:
+            if os.path.isdir(parts_dir):
+                shutil.rmtree(parts_dir)
+            os.makedirs(parts_dir)
+
+        extension = os.path.splitext(self.filename)[1]
+        part_file = os.path.join(parts_dir, f"part-{self.parts_written:06d}{extension}")
+        temp_file = os.path.join(parts_dir, f"tmp-{self.parts_written:06d}{extension}")
+        save_landmarks(self.buffer.landmarks, temp_file, self.buffer.frames, self.buffer.timestamps,
+                       self.metadata, verbose=False)
+        with open(temp_file, "rb") as f:
+            os.fsync(f.fileno())
+        # Parts only appear under their final name once complete
+        os.replace(temp_file, part_file)
+        self.parts_written += 1
+
+    def close(self):
+        """
+        Write any buffered frames and finish the file.
+        """
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+
+        if self.file is not None:
+            self.file.close()
+        if self.store is not None:
+            self.store.close()
+        if self.parts_written:
+            # Merge the parts into the final file one part at a time, then remove them
+            parts_dir = self.filename + PARTS_SUFFIX
+            part_files = sorted(glob.glob(os.path.join(parts_dir, "part-*")))
+            if self.file_format == "parquet":
+                merge_parquet_parts(part_files, self.filename, self.metadata)
+            else:
+                merge_npz_parts(part_files, self.filename, self.metadata)
+            shutil.rmtree(parts_dir)
+
+        if self.frames_written:
+            print(f"Data saved to {self.filename}")
+
+
+class SegmentedLandmarkWriter:
+    """
+    Landmark writer for long recordings that rolls over to a new segment
+    file every `segment_frames` frames and/or `segment_seconds` seconds of
+    capture time, so no single file grows without bound. Segments are named
+    <stem>_0001<ext>, <stem>_0002<ext>, ... and a manifest <stem>.session.json
+    lists them with their frame ranges; load_landmarks, iter_landmark_chunks
+    and kinematics_calculator.py read the manifest as one session.
+
+    Each segment is written by a LandmarkWriter. Finishing a segment (which
+    merges the parts of a .parquet/.npz) happens on a background thread, so
+    rotating never stalls the caller. The manifest is rewritten atomically
+    whenever a segment starts or is finished.
+    """
+
+    def __init__(self, filename: str, metadata: Optional[dict] = None, segment_frames: Optional[int] = None,
+                 segment_seconds: Optional[float] = None, **writer_options):
+        """
+        Args:
+            filename: Session file name, e.g. pose_data.csv; the extension selects the segment format
+            metadata: Capture metadata stored with every segment (and in the manifest)
+            segment_frames: Start a new segment after this many frames
+            segment_seconds: Start a new segment once a segment spans this many seconds
+            writer_options: Passed on to each segment's LandmarkWriter
+        """
+        self.file_format = landmark_format(filename)
+        stem, self.extension = os.path.splitext(filename)
+        self.stem = stem
+        self.manifest_file = stem + SESSION_SUFFIX
+        self.metadata = metadata if metadata is not None else {}
+        self.segment_frames = segment_frames
+        self.segment_seconds = segment_seconds
+        self.writer_options = writer_options
+        self.writer = None
+        self.segment = None
+        self.segments = []
+        self.frames_closed = 0
+        self.lock = threading.Lock()
+        self.pending = queue.Queue()
+        self.closer = threading.Thread(target=self.close_loop, name="segment-closer", daemon=True)
+        self.closer.start()
+        self.errors = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def frames_written(self) -> int:
+        """
+        Frames in finished segments plus those written in the current one.
+        """
+        return self.frames_closed + (self.writer.frames_written if self.writer is not None else 0)
+
+    @property
+    def frame_count(self) -> int:
+        return self.frames_closed + (self.writer.frame_count if self.writer is not None else 0)
+
+    def segment_due(self, timestamp: float) -> bool:
+        """
+        Return True if the next frame should start a new segment.
+        """
+        if self.writer is None:
+            return True
+        if self.segment_frames and self.segment["frames"] >= self.segment_frames:
+            return True
+        if self.segment_seconds and timestamp - self.segment["first_timestamp"] >= self.segment_seconds:
+            return True
+        return False
+
+    def append(self, landmarks, frame: int, timestamp: float = float("nan")) -> np.ndarray:
+        """
+        Append one frame (see LandmarkWriter.append), starting a new segment first if one is due.
+        """
+        if self.errors:
+            raise self.errors[0]
+        if self.segment_due(timestamp):
+            self.rotate(frame, timestamp)
+        row = self.writer.append(landmarks, frame, timestamp)
+        with self.lock:
+            self.segment["frames"] += 1
+            self.segment["last_frame"] = int(frame)
+            self.segment["last_timestamp"] = float(timestamp)
+        return row
+
+    def rotate(self, frame: int, timestamp: float):
+        """
+        Hand the current segment to the closer thread and open the next one.
+        """
+        if self.writer is not None:
+            self.pending.put((self.writer, self.segment))
+        number = len(self.segments) + 1
+        filename = f"{self.stem}_{number:04d}{self.extension}"
+        metadata = dict(self.metadata, session={"manifest": os.path.basename(self.manifest_file), "segment": number})
+        self.writer = LandmarkWriter(filename, metadata, **self.writer_options)
+        self.segment = {
+            "file": os.path.basename(filename),
+            "segment": number,
+            "first_frame": int(frame),
+            "last_frame": int(frame),
+            "first_timestamp": float(timestamp),
+            "last_timestamp": float(timestamp),
+            "frames": 0,
+            "complete": False,
+        }
+        with self.lock:
+            self.segments.append(self.segment)
+        self.write_manifest()
+
+    def close_loop(self):
+        """
+        Closer thread: finish handed-over segments and record them in the manifest.
+        """
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            writer, segment = item
+            try:
+                writer.close()
+            except Exception as e:
+                self.errors.append(e)
+                continue
+            with self.lock:
+                segment["complete"] = True
+                self.frames_closed += writer.frames_written
+            self.write_manifest()
+
+    def write_manifest(self, complete: bool = False):
+        """
+        Atomically rewrite the manifest with the current list of segments.
+        """
+        with self.lock:
+            manifest = {
+                "format": self.file_format,
+                "metadata": self.metadata,
+                "segment_frames": self.segment_frames,
+                "segment_seconds": self.segment_seconds,
+                "frames": sum(segment["frames"] for segment in self.segments),
+                "complete": complete,
+                "segments": [dict(segment) for segment in self.segments],
+            }
+            temp_file = f"{self.manifest_file}.tmp"
+            with open(temp_file, "w") as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(temp_file, self.manifest_file)
+
+    def close(self):
+        """
+        Finish the current segment, wait for the pending ones and complete the manifest.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.writer is not None:
+            self.pending.put((self.writer, self.segment))
+        self.pending.put(None)
+        self.closer.join()
+        self.writer = None
+        if self.errors:
+            raise self.errors[0]
+        if self.segments:
+            self.write_manifest(complete=True)
+            print(f"Session of {len(self.segments)} segments saved to {self.manifest_file}")
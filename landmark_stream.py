@@ -0,0 +1,315 @@
+import argparse
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from kinematics_calculator import KINEMATICS_COLUMNS, kinematics_arrays
+from landmark_io import LANDMARK_VALUES, NUM_LANDMARKS
+
+# Live landmark stream: a TCP server on localhost that sends every
+# subscriber a session message when it connects, then one binary message per
+# frame with a detected pose, then an end message. Each message is prefixed
+# with its length (uint32, little-endian) and starts with a type byte.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+PROTOCOL_VERSION = 1
+
+# Session: type byte followed by UTF-8 JSON (protocol version, angle names, capture metadata)
+MESSAGE_SESSION = 1
+# Frame: type byte, frame index (int64) and timestamp (float64), followed by
+# the (33, 4) float32 landmarks (x, y, z, visibility) and one float32 per angle
+MESSAGE_FRAME = 2
+# End of the session (no payload)
+MESSAGE_END = 3
+
+LENGTH_PREFIX = struct.Struct("<I")
+FRAME_HEADER = struct.Struct("<Bqd")
+
+
+def pack_frame(frame: int, timestamp: float, landmarks: np.ndarray, angles: np.ndarray) -> bytes:
+    """
+    Encode one frame message (without its length prefix).
+    """
+    return (FRAME_HEADER.pack(MESSAGE_FRAME, frame, timestamp)
+            + np.ascontiguousarray(landmarks, dtype="<f4").tobytes()
+            + np.ascontiguousarray(angles, dtype="<f4").tobytes())
+
+
+def unpack_frame(payload: bytes, angle_names: List[str]) -> dict:
+    """
+    Decode a frame message into its frame index, timestamp, (33, 4) landmarks
+    and a dict of angles (degrees, NaN where undefined).
+    """
+    _, frame, timestamp = FRAME_HEADER.unpack_from(payload)
+    values = np.frombuffer(payload, dtype="<f4", offset=FRAME_HEADER.size)
+    landmark_count = NUM_LANDMARKS * LANDMARK_VALUES
+    if len(values) != landmark_count + len(angle_names):
+        raise ValueError(f"Frame message has {len(values)} values, expected {landmark_count + len(angle_names)}")
+    return {
+        "frame": frame,
+        "timestamp": timestamp,
+        "landmarks": values[:landmark_count].reshape(NUM_LANDMARKS, LANDMARK_VALUES),
+        "angles": dict(zip(angle_names, values[landmark_count:].tolist())),
+    }
+
+
+class LandmarkPublisher:
+    """
+    Streams each frame's landmarks and kinematics angles to any number of
+    local subscribers while a session is recorded. Subscribers can connect
+    at any time and receive the frames from then on.
+
+    publish() never blocks the caller: every subscriber has its own bounded
+    queue drained by a sender thread, and messages for a subscriber that
+    cannot keep up are dropped (and counted) instead of delaying capture.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, metadata: Optional[dict] = None,
+                 queue_size: int = 64):
+        """
+        Args:
+            host: Interface to listen on (localhost by default; the stream is not authenticated)
+            port: TCP port to listen on (0 picks a free port, see self.port)
+            metadata: Capture metadata sent to every subscriber in the session message
+            queue_size: Messages buffered per subscriber before new ones are dropped
+        """
+        self.metadata = metadata or {}
+        self.queue_size = queue_size
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.frames_published = 0
+        self.messages_dropped = 0
+        self.closed = False
+
+        self.server = socket.create_server((host, port))
+        self.server.settimeout(0.2)
+        self.host, self.port = self.server.getsockname()[:2]
+        self.accept_thread = threading.Thread(target=self.accept_loop, name="stream-accept", daemon=True)
+        self.accept_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def session_message(self) -> bytes:
+        description = {
+            "protocol": PROTOCOL_VERSION,
+            "landmarks": NUM_LANDMARKS,
+            "values": ["x", "y", "z", "visibility"],
+            "angles": KINEMATICS_COLUMNS,
+            "metadata": self.metadata,
+        }
+        return bytes([MESSAGE_SESSION]) + json.dumps(description).encode("utf-8")
+
+    def accept_loop(self):
+        """
+        Accept subscribers until the publisher is closed.
+        """
+        while not self.closed:
+            try:
+                connection, address = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            messages = queue.Queue(maxsize=self.queue_size)
+            messages.put(self.session_message())
+            subscriber = {"connection": connection, "address": address, "messages": messages}
+            sender = threading.Thread(target=self.send_loop, args=(subscriber,), name="stream-send", daemon=True)
+            subscriber["thread"] = sender
+            with self.lock:
+                self.subscribers.append(subscriber)
+            sender.start()
+            print(f"Stream subscriber connected from {address[0]}:{address[1]}")
+
+    def send_loop(self, subscriber: dict):
+        """
+        Sender thread of one subscriber: write its queued messages until the
+        end message is sent or the subscriber disconnects.
+        """
+        connection = subscriber["connection"]
+        try:
+            while True:
+                message = subscriber["messages"].get()
+                connection.sendall(LENGTH_PREFIX.pack(len(message)) + message)
+                if message[0] == MESSAGE_END:
+                    break
+        except OSError:
+            print(f"Stream subscriber {subscriber['address'][0]}:{subscriber['address'][1]} disconnected")
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+            connection.close()
+
+    def publish(self, frame: int, timestamp: float, landmarks: np.ndarray, angles: Optional[np.ndarray] = None):
+        """
+        Queue one frame for every subscriber.
+
+        Args:
+            frame: Source frame index
+            timestamp: Capture timestamp in seconds
+            landmarks: (33, 4) array of x, y, z and visibility
+            angles: One value per KINEMATICS_COLUMNS entry (computed from the landmarks if not given)
+        """
+        self.frames_published += 1
+        with self.lock:
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            # Nobody is listening: skip computing the angles
+            return
+        if angles is None:
+            angles = frame_angles(landmarks)
+        message = pack_frame(frame, timestamp, landmarks, angles)
+        for subscriber in subscribers:
+            try:
+                subscriber["messages"].put_nowait(message)
+            except queue.Full:
+                self.messages_dropped += 1
+
+    def close(self):
+        """
+        Send the end message, let the senders finish and stop listening.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.server.close()
+        self.accept_thread.join()
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            # The end message must get through, so wait for room in the queue
+            try:
+                subscriber["messages"].put(bytes([MESSAGE_END]), timeout=1.0)
+            except queue.Full:
+                # Stalled subscriber: shutting the socket down wakes its blocked sender
+                try:
+                    subscriber["connection"].shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        for subscriber in subscribers:
+            subscriber["thread"].join(timeout=2.0)
+
+    def report(self) -> str:
+        return (f"Stream: {self.frames_published} frames published on {self.host}:{self.port}, "
+                f"{self.messages_dropped} messages dropped for slow subscribers")
+
+
+def frame_angles(landmarks: np.ndarray) -> np.ndarray:
+    """
+    The KINEMATICS_COLUMNS values of a single frame's (33, 3) or (33, 4) landmarks.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kinematics = kinematics_arrays(landmarks[np.newaxis, :, :3])
+    return np.array([kinematics[column][0] for column in KINEMATICS_COLUMNS], dtype=np.float32)
+
+
+class LandmarkSubscriber:
+    """
+    Client of a LandmarkPublisher. Iterating over it yields one dict per
+    frame (see unpack_frame) until the session ends or the connection drops.
+    The session description (angle names, capture metadata) is available as
+    self.session once the first frame has been received.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: Optional[float] = 5.0):
+        """
+        Args:
+            host: Host of the publisher
+            port: Port of the publisher
+            timeout: Seconds to wait for the connection
+        """
+        self.connection = socket.create_connection((host, port), timeout=timeout)
+        self.connection.settimeout(None)
+        self.reader = self.connection.makefile("rb")
+        self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read_message(self) -> Optional[bytes]:
+        """
+        Read the next message, or None when the connection was closed.
+        """
+        prefix = self.reader.read(LENGTH_PREFIX.size)
+        if len(prefix) < LENGTH_PREFIX.size:
+            return None
+        (length,) = LENGTH_PREFIX.unpack(prefix)
+        payload = self.reader.read(length)
+        if len(payload) < length:
+            return None
+        return payload
+
+    def __iter__(self) -> Iterator[dict]:
+        while True:
+            payload = self.read_message()
+            if payload is None or payload[0] == MESSAGE_END:
+                return
+            if payload[0] == MESSAGE_SESSION:
+                self.session = json.loads(payload[1:].decode("utf-8"))
+                if self.session["protocol"] != PROTOCOL_VERSION:
+                    raise ValueError(f"Unsupported stream protocol {self.session['protocol']}")
+            elif payload[0] == MESSAGE_FRAME:
+                if self.session is None:
+                    raise ValueError("Frame received before the session message")
+                yield unpack_frame(payload, self.session["angles"])
+
+    def close(self):
+        self.reader.close()
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subscribe to the live landmark stream of motion_extract_record.py "
+                                     "and print each frame's angles.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Publisher host (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Publisher port (default: {DEFAULT_PORT})")
+    parser.add_argument("--angles", default="left_knee_angle,right_knee_angle",
+                        help="Comma-separated angles to print (default: left_knee_angle,right_knee_angle)")
+    parser.add_argument("--output", help="Also save the received angles to this CSV file")
+    args = parser.parse_args()
+
+    try:
+        subscriber = LandmarkSubscriber(args.host, args.port)
+    except OSError as e:
+        print(f"Error: Could not connect to {args.host}:{args.port} ({e})")
+        return
+
+    names = [name.strip() for name in args.angles.split(",")]
+    output = None
+    received = 0
+    start_time = time.perf_counter()
+    with subscriber:
+        for message in subscriber:
+            if output is None and args.output:
+                output = open(args.output, "w")
+                output.write(",".join(["frame", "timestamp"] + subscriber.session["angles"]) + "\n")
+            if output is not None:
+                output.write(",".join([str(message["frame"]), repr(message["timestamp"])]
+                                      + [repr(value) for value in message["angles"].values()]) + "\n")
+            angles = ", ".join(f"{name} {message['angles'].get(name, float('nan')):6.1f}" for name in names)
+            print(f"frame {message['frame']:6d}  t={message['timestamp']:8.3f} s  {angles}")
+            received += 1
+
+    if output is not None:
+        output.close()
+        print(f"Angles saved to {args.output}")
+    elapsed = time.perf_counter() - start_time
+    print(f"Session ended: {received} frames received in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
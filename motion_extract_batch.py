@@ -0,0 +1,220 @@
+import os
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+from extraction_cache import DEFAULT_CACHE_DIR
+
+# File extensions picked up when the input is a directory
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm")
+
+MANIFEST_NAME = "manifest.json"
+
+
+def find_videos(source: str) -> List[str]:
+    """
+    Return the sorted list of video files in a directory, or matching a glob pattern.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def load_manifest(manifest_file: str) -> dict:
+    """
+    Load the job manifest, or create an empty one if it doesn't exist.
+    """
+    if os.path.exists(manifest_file):
+        try:
+            with open(manifest_file, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: could not parse {manifest_file}, starting a new manifest")
+    return {"files": {}}
+
+
+def save_manifest(manifest: dict, manifest_file: str):
+    """
+    Save the job manifest atomically, so a crash never leaves a truncated file.
+    """
+    temp_file = manifest_file + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(temp_file, manifest_file)
+
+
+def source_root(source: str) -> str:
+    """
+    Directory that output paths are made relative to: the source directory,
+    or the part of a glob pattern before its first wildcard component.
+    """
+    if os.path.isdir(source):
+        return source
+    parts = source.split(os.sep)
+    for i, part in enumerate(parts):
+        if glob.has_magic(part):
+            return os.sep.join(parts[:i]) or os.curdir
+    return os.path.dirname(source) or os.curdir
+
+
+def output_path(input_file: str, output_dir: str, file_format: str, root: str = None) -> str:
+    """
+    Output file for a video: <output_dir>/<path relative to root without extension>.<format>,
+    so videos with the same name in different subdirectories get different outputs.
+    """
+    relative = os.path.relpath(input_file, root) if root else os.path.basename(input_file)
+    name = os.path.splitext(relative)[0]
+    return os.path.join(output_dir, f"{name}.{file_format}")
+
+
+def duplicate_outputs(outputs: dict) -> dict:
+    """
+    Output files claimed by more than one video ({output: [videos]}), given {video: output}.
+    """
+    claimed = {}
+    for video, output_file in outputs.items():
+        claimed.setdefault(os.path.abspath(output_file), []).append(video)
+    return {output_file: videos for output_file, videos in claimed.items() if len(videos) > 1}
+
+
+def is_completed(entry: dict) -> bool:
+    """
+    A file is complete if its last run succeeded and its output (if any) still exists.
+    """
+    if entry.get("status") != "done":
+        return False
+    return entry.get("output") is None or os.path.exists(entry["output"])
+
+
+def extract_file(input_file: str, output_file: str, cache_dir: str = None) -> dict:
+    """
+    Worker: extract one video headless and return its run summary. With a
+    cache_dir, a cached extraction of the same video is reused if present.
+    """
+    # Imported here so the parent process stays light and workers load MediaPipe themselves
+    from pose_extraction import extraction_params, process_video
+
+    if cache_dir is None:
+        summary = process_video(input_file, output_file, headless=True)
+    else:
+        from extraction_cache import ExtractionCache, cached_extraction
+        summary = cached_extraction(input_file, output_file, extraction_params(),
+                                    lambda: process_video(input_file, output_file, headless=True),
+                                    ExtractionCache(cache_dir))
+    if summary is None:
+        raise IOError(f"Could not open video file {input_file}")
+    return summary
+
+
+def run_batch(source: str, output_dir: str, file_format: str = "parquet", workers: int = None,
+              manifest_file: str = None, retry_failed: bool = False, cache_dir: str = None) -> dict:
+    """
+    Extract pose data from every video in a directory or glob with a pool of
+    worker processes, recording per-file status, duration and frame counts in
+    a JSON manifest. Files already completed according to the manifest are
+    skipped, so an interrupted batch resumes where it stopped.
+
+    Args:
+        source: Directory of videos or glob pattern
+        output_dir: Directory for the landmark files
+        file_format: Output format (csv, parquet, npz or h5)
+        workers: Number of worker processes (default: number of CPU cores)
+        manifest_file: Path to the manifest (default: <output_dir>/manifest.json)
+        retry_failed: Also re-run files that failed previously
+        cache_dir: Extraction cache directory (see extraction_cache.py; default: no cache)
+
+    Returns the manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_file = manifest_file or os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_file)
+
+    videos = find_videos(source)
+    root = source_root(source)
+    outputs = {video: output_path(video, output_dir, file_format, root) for video in videos}
+    # Two videos writing one file would silently lose one result (e.g. a.mp4 and a.mov)
+    duplicates = duplicate_outputs(outputs)
+    if duplicates:
+        for output_file, clashing in duplicates.items():
+            print(f"Error: {', '.join(clashing)} would all be written to {output_file}")
+        print("Rename or move the videos so each has a distinct output; nothing was processed")
+        return manifest
+
+    pending = []
+    for video in videos:
+        entry = manifest["files"].get(os.path.abspath(video), {})
+        if is_completed(entry):
+            continue
+        if entry.get("status") == "failed" and not retry_failed:
+            continue
+        pending.append(video)
+
+    print(f"Found {len(videos)} videos, {len(videos) - len(pending)} already processed or failed, "
+          f"{len(pending)} to process")
+    if not pending:
+        return manifest
+
+    workers = workers or os.cpu_count() or 1
+    batch_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for video in pending:
+            output_file = outputs[video]
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            futures[executor.submit(extract_file, video, output_file, cache_dir)] = video
+            manifest["files"][os.path.abspath(video)] = {
+                "status": "running",
+                "submitted": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        save_manifest(manifest, manifest_file)
+
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            video = futures[future]
+            entry = manifest["files"][os.path.abspath(video)]
+            entry["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                summary = future.result()
+                entry.update(status="done", **summary)
+                print(f"[{done_count}/{len(pending)}] {video}: {summary['frames']} frames "
+                      f"({summary['frames_with_pose']} with a pose) in {summary['seconds']:.1f} s"
+                      f"{' (cached)' if summary.get('cached') else ''}")
+            except Exception as e:
+                entry.update(status="failed", error=str(e))
+                print(f"[{done_count}/{len(pending)}] {video}: failed ({e})")
+            # Record progress after every file so a crashed run can resume
+            save_manifest(manifest, manifest_file)
+
+    print(f"Batch complete in {time.perf_counter() - batch_start:.1f} s. Manifest saved to {manifest_file}")
+
+    return manifest
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description="Extract pose data from a directory (or glob) of videos in parallel.")
+    parser.add_argument("source", help="Directory containing videos, or a glob pattern such as 'clinic/**/*.mp4'")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the extracted landmark files")
+    parser.add_argument("-f", "--format", choices=["csv", "parquet", "npz", "h5"], default="parquet",
+                        help="Output file format (default: parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: number of CPU cores)")
+    parser.add_argument("--manifest", help=f"Path to the job manifest (default: <output-dir>/{MANIFEST_NAME})")
+    parser.add_argument("--retry-failed", action="store_true", help="Also re-run files that failed previously")
+    parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_DIR, metavar="DIR",
+                        help="Reuse cached extractions of unchanged videos, and cache new ones "
+                             f"(default directory: {DEFAULT_CACHE_DIR})")
+    args = parser.parse_args()
+
+    run_batch(args.source, args.output_dir, args.format, args.workers, args.manifest, args.retry_failed, args.cache)
+
+
+if __name__ == "__main__":
+    main()
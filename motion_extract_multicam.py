@@ -0,0 +1,333 @@
+import numpy as np
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+
+from pose_extraction import (DEFAULT_PROFILE, PROFILES, create_pose, decode_frames, extract_frame_range,
+                             extraction_summary, video_metadata)
+
+# OpenCV and the pandas-based landmark I/O are imported inside the functions
+# that use them (as in pose_extraction), so --help and the spawned worker
+# processes don't pay for them up front.
+
+# Seconds between starting the webcam workers and the common start of the
+# recording, so every worker has opened its camera and Pose graph by then
+CAMERA_START_DELAY = 5.0
+
+
+def probe_source(source: Union[str, int], duration: Optional[float] = None) -> dict:
+    """
+    Frame rate, resolution and time span of a video file or webcam, checked
+    before the workers start.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {'camera' if isinstance(source, int) else 'video file'} {source}")
+    info = {
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    }
+    cap.release()
+
+    if isinstance(source, int):
+        # Webcams are recorded for the same interval of the common clock
+        info["start"], info["end"] = 0.0, duration
+    else:
+        if info["fps"] <= 0 or info["total_frames"] <= 0:
+            raise IOError(f"Video file {source} does not report its frame rate and frame count")
+        # Timestamps of the first and last frame
+        info["start"], info["end"] = 0.0, (info["total_frames"] - 1) / info["fps"]
+    return info
+
+
+def record_camera(index: int, duration: float, session_start: float, profile: str = DEFAULT_PROFILE):
+    """
+    Worker: run the pose on a webcam from session_start (a time.time() value
+    shared by all workers) for `duration` seconds, with its own Pose graph.
+    Frames are timestamped on the common clock when they are captured. With a
+    profile stride above 1, only every stride-th captured frame is analyzed.
+
+    Returns (frame_indices, timestamps, landmarks) arrays for the analyzed
+    frames, the landmarks of shape (frames, 33, 4) and NaN where no pose was detected.
+    """
+    import cv2
+    from landmark_io import LandmarkBuffer
+
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        raise IOError(f"Could not open camera {index}")
+    # Keep only the newest frame in the driver so captures are not stale
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    buffer = LandmarkBuffer()
+    settings = PROFILES[profile]
+
+    with create_pose(profile) as pose:
+        # Wait for the common start, so all cameras cover the same interval
+        time.sleep(max(session_start - time.time(), 0.0))
+        for frame_index, timestamp, image_rgb in decode_frames(cap, settings["input_scale"], settings["stride"],
+                                                               clock=lambda: time.time() - session_start):
+            if timestamp > duration:
+                break
+            results = pose.process(image_rgb)
+            buffer.append(results.pose_landmarks, frame_index, timestamp)
+
+    cap.release()
+
+    return buffer.frames, buffer.timestamps, buffer.landmarks
+
+
+def align_cameras(tracks: List[dict], fps: float, tolerance: Optional[float] = None) -> dict:
+    """
+    Resample the analyzed frames of several cameras onto one timeline of `fps`
+    instants spanning the interval every camera covers. At each instant a
+    camera contributes its frame nearest in time, if that frame is within
+    `tolerance` seconds (default: half of the camera's frame interval);
+    otherwise its landmarks are NaN and its source frame is -1. Frames
+    without a pose contribute their NaN landmarks.
+
+    Args:
+        tracks: Per camera, a dict with the "frames", "timestamps" (on the
+            common clock) and "landmarks" of its analyzed frames, the "fps" at
+            which it analyzed frames (a stride of 2 halves the source rate) and
+            the "start" and "end" of its recording on the common clock
+        fps: Rate of the common timeline
+        tolerance: Maximum distance in seconds between an instant and the matched frame
+
+    Returns a dict with the "timestamps" (frames,), "landmarks" (frames, cameras, 33, 4),
+    "source_frames" and "source_timestamps" (frames, cameras) arrays.
+    """
+    from landmark_io import LANDMARK_VALUES, NUM_LANDMARKS
+
+    start = max(track["start"] for track in tracks)
+    end = min(track["end"] for track in tracks)
+    if end < start:
+        raise ValueError("The recordings do not overlap in time; check the camera offsets")
+    # Small epsilon so an end that falls exactly on an instant is kept despite rounding
+    num_frames = int(np.floor((end - start) * fps + 1e-6)) + 1
+    timestamps = start + np.arange(num_frames) / fps
+
+    landmarks = np.full((num_frames, len(tracks), NUM_LANDMARKS, LANDMARK_VALUES), np.nan, dtype=np.float32)
+    source_frames = np.full((num_frames, len(tracks)), -1, dtype=np.int64)
+    source_timestamps = np.full((num_frames, len(tracks)), np.nan)
+
+    for camera, track in enumerate(tracks):
+        times = np.asarray(track["timestamps"], dtype=np.float64)
+        if len(times) == 0:
+            continue
+        # Nearest frame to every instant: the one after it or the one before
+        after = np.clip(np.searchsorted(times, timestamps), 0, len(times) - 1)
+        before = np.clip(after - 1, 0, len(times) - 1)
+        nearest = np.where(np.abs(times[before] - timestamps) <= np.abs(times[after] - timestamps), before, after)
+        # A frame further away means the camera did not analyze a frame at this instant
+        limit = tolerance if tolerance is not None else 0.5 / track["fps"]
+        matched = np.abs(times[nearest] - timestamps) <= limit + 1e-9
+
+        landmarks[matched, camera] = track["landmarks"][nearest[matched]]
+        source_frames[matched, camera] = track["frames"][nearest[matched]]
+        source_timestamps[matched, camera] = track["source_timestamps"][nearest[matched]]
+
+    return {
+        "timestamps": timestamps,
+        "landmarks": landmarks,
+        "source_frames": source_frames,
+        "source_timestamps": source_timestamps,
+    }
+
+
+def process_cameras(sources: List[Union[str, int]], output_file: str, cameras: Optional[List[str]] = None,
+                    offsets: Optional[List[float]] = None, fps: Optional[float] = None,
+                    tolerance: Optional[float] = None, duration: Optional[float] = None,
+                    profile: str = DEFAULT_PROFILE):
+    """
+    Extract the pose from several synchronized views of the same movement
+    (e.g. frontal and sagittal recordings of a squat) and save them as one
+    time-aligned landmark store with a camera axis (see save_multicam_landmarks).
+
+    Every source is processed by its own worker process with its own Pose
+    graph, in parallel. The analyzed frames are then aligned by timestamp onto a
+    common timeline (see align_cameras).
+
+    Args:
+        sources: Video files, or webcam indices (recorded live for `duration` seconds)
+        output_file: Path to save the output file (.npz or .h5)
+        cameras: Name of each view (default: the video file names, or camera0, camera1, ...)
+        offsets: Start time of each recording on the common clock in seconds, added to
+            its timestamps (e.g. [0, 0.4] when the second recording started 0.4 s later)
+        fps: Rate of the common timeline (default: the highest analyzed frame rate,
+            i.e. the source frame rate divided by the profile stride)
+        tolerance: Maximum seconds between an instant of the timeline and the frame
+            matched to it (default: half of each camera's analyzed frame interval)
+        duration: Recording length in seconds for webcam sources
+        profile: Speed/accuracy profile (see PROFILES)
+
+    Returns a summary of the run (see extraction_summary), with the number of
+    instants each camera has a pose in "camera_frames_with_pose", or None if
+    the sources could not be processed.
+    """
+    from landmark_io import save_multicam_landmarks
+
+    live = isinstance(sources[0], int)
+    if cameras is None:
+        cameras = [f"camera{source}" if live else os.path.splitext(os.path.basename(source))[0]
+                   for source in sources]
+    # Views are looked up by name in the store, so a repeated name would hide a view
+    duplicates = sorted({camera for camera in cameras if cameras.count(camera) > 1})
+    if duplicates:
+        print(f"Error: several views are named {', '.join(duplicates)}; "
+              f"give each view a distinct name (--cameras)")
+        return
+    offsets = offsets or [0.0] * len(sources)
+
+    try:
+        probes = [probe_source(source, duration) for source in sources]
+    except IOError as e:
+        print(f"Error: {e}")
+        return
+    for camera, source, probe, offset in zip(cameras, sources, probes, offsets):
+        print(f"Camera '{camera}': {source}, {probe['width']}x{probe['height']}, FPS: {probe['fps']}"
+              + (f", Total frames: {probe['total_frames']}" if not live else "")
+              + (f", offset {offset:+.3f} s" if offset else ""))
+
+    # Live frames are timestamped on the wall clock, which all worker processes share
+    session_start = time.time() + CAMERA_START_DELAY if live else None
+    if live:
+        print(f"Recording {len(sources)} cameras for {duration:.1f} s, starting in {CAMERA_START_DELAY:.0f} s...")
+    else:
+        print(f"Extracting {len(sources)} videos in parallel worker processes...")
+
+    start_time = time.perf_counter()
+    # Use fresh interpreters so no MediaPipe or OpenCV thread state is inherited
+    with ProcessPoolExecutor(max_workers=len(sources), mp_context=multiprocessing.get_context("spawn")) as executor:
+        if live:
+            futures = [executor.submit(record_camera, source, duration, session_start, profile) for source in sources]
+        else:
+            futures = [executor.submit(extract_frame_range, source, 0, None, 0, profile) for source in sources]
+        try:
+            results = [future.result() for future in futures]
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+    extract_seconds = time.perf_counter() - start_time
+
+    stride = PROFILES[profile]["stride"]
+    tracks = []
+    for camera, probe, offset, (frames, timestamps, landmarks) in zip(cameras, probes, offsets, results):
+        print(f"Camera '{camera}': {int(np.count_nonzero(~np.isnan(landmarks[:, 0, 0])))} of {len(frames)} "
+              "frames with a pose")
+        tracks.append({
+            "frames": frames,
+            "timestamps": timestamps + offset,
+            "source_timestamps": timestamps,
+            "landmarks": landmarks,
+            # The rate actually analyzed: live cameras rarely deliver their nominal rate,
+            # and with a profile stride only every stride-th frame is analyzed
+            "fps": ((frames[-1] + 1) / duration if live and len(frames) else probe["fps"] or 30.0) / stride,
+            "start": probe["start"] + offset,
+            "end": probe["end"] + offset,
+        })
+
+    fps = fps or max(track["fps"] for track in tracks)
+    try:
+        aligned = align_cameras(tracks, fps, tolerance)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    num_frames = len(aligned["timestamps"])
+    with_pose = ~np.isnan(aligned["landmarks"][:, :, 0, 0])
+    print(f"Aligned {num_frames} instants at {fps:.2f} FPS "
+          f"({aligned['timestamps'][0] if num_frames else 0.0:.3f} s to "
+          f"{aligned['timestamps'][-1] if num_frames else 0.0:.3f} s); "
+          f"{int(with_pose.all(axis=1).sum())} with a pose in every camera")
+    for camera, count in zip(cameras, with_pose.sum(axis=0)):
+        print(f"  {camera}: pose at {count} instants ({count / num_frames if num_frames else 0.0:.1%})")
+
+    metadata = {
+        "fps": fps,
+        "profile": profile,
+        "offsets": offsets,
+        "tolerance": tolerance,
+        "camera_metadata": {
+            camera: video_metadata(str(source), probe["fps"], probe["width"], probe["height"],
+                                   probe["total_frames"], profile)
+            for camera, source, probe in zip(cameras, sources, probes)
+        },
+    }
+    if live:
+        metadata["duration"] = duration
+
+    elapsed = time.perf_counter() - start_time
+    save_multicam_landmarks(output_file, cameras, aligned["timestamps"], aligned["landmarks"],
+                            aligned["source_frames"], aligned["source_timestamps"], metadata)
+    print(f"Processed {len(sources)} sources in {elapsed:.1f} s (pose extraction {extract_seconds:.1f} s)")
+
+    frames_with_pose = int(with_pose.any(axis=1).sum())
+    summary = extraction_summary(num_frames, frames_with_pose, elapsed, output_file)
+    summary["camera_frames_with_pose"] = dict(zip(cameras, with_pose.sum(axis=0).tolist()))
+    return summary
+
+
+def parse_source(text: str) -> Union[str, int]:
+    """
+    A webcam index ("0", "1", ...) or a video file path.
+    """
+    return int(text) if text.isdigit() else text
+
+
+def main():
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description="Extract time-aligned pose data from several synchronized "
+                                     "camera views (video files or webcams) with one worker process per view.")
+    parser.add_argument("-i", "--inputs", nargs="+", required=True,
+                        help="Video files, or webcam indices (e.g. 0 1), one per view")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Output file path (.npz or .h5); the landmarks have a camera axis")
+    parser.add_argument("--cameras", help="Comma-separated view names, e.g. frontal,sagittal "
+                        "(default: the video file names, or camera0, camera1, ...)")
+    parser.add_argument("--offsets", help="Comma-separated start time of each recording in seconds, added to its "
+                        "timestamps, e.g. 0,0.4 when the second recording started 0.4 s later (default: all 0)")
+    parser.add_argument("--fps", type=float, help="Rate of the common timeline "
+                        "(default: the highest source FPS divided by the profile stride)")
+    parser.add_argument("--tolerance", type=float,
+                        help="Maximum seconds between an instant and the frame matched to it "
+                             "(default: half of each camera's analyzed frame interval)")
+    parser.add_argument("--duration", type=float, help="Recording length in seconds (required for webcams)")
+    parser.add_argument("--profile", choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help=f"Speed/accuracy profile (default: {DEFAULT_PROFILE})")
+    args = parser.parse_args()
+
+    sources = [parse_source(source) for source in args.inputs]
+    if len(sources) < 2:
+        parser.error("at least two sources are needed")
+    live = [isinstance(source, int) for source in sources]
+    if any(live) and not all(live):
+        parser.error("video files and webcams cannot be combined (they have no common clock)")
+    if all(live) and not args.duration:
+        parser.error("--duration is required for webcams")
+    if os.path.splitext(args.output)[1].lower() not in (".npz", ".h5", ".hdf5"):
+        parser.error("the output must be a .npz or .h5 file")
+
+    cameras = None
+    if args.cameras:
+        cameras = [camera.strip() for camera in args.cameras.split(",")]
+        if len(cameras) != len(sources) or len(set(cameras)) != len(cameras):
+            parser.error("--cameras needs one distinct name per source")
+    offsets = None
+    if args.offsets:
+        offsets = [float(offset) for offset in args.offsets.split(",")]
+        if len(offsets) != len(sources):
+            parser.error("--offsets needs one value per source")
+
+    process_cameras(sources, args.output, cameras, offsets, args.fps, args.tolerance, args.duration, args.profile)
+
+
+if __name__ == "__main__":
+    main()
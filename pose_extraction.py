@@ -0,0 +1,909 @@
+import numpy as np
+import os
+import json
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+from instrumentation import StageTimer
+
+# Pose extraction library behind motion_extract_file.py, motion_extract_record.py
+# and motion_extract_multicam.py. OpenCV, MediaPipe (over a second to import,
+# mostly for its matplotlib drawing utilities) and the pandas-based landmark
+# I/O are imported inside the functions that use them, so importing this
+# module, a script's --help and spawning worker processes stay fast.
+
+# Settings passed to MediaPipe's Pose (also recorded in the output metadata)
+POSE_OPTIONS = {
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+# Named speed/accuracy trade-offs: MediaPipe model complexity (0 = lite,
+# 1 = full, 2 = heavy), landmark smoothing, the scale of the image passed to
+# MediaPipe and the frame stride. "balanced" matches MediaPipe's defaults.
+PROFILES = {
+    "fast": {"model_complexity": 0, "smooth_landmarks": False, "input_scale": 0.5, "stride": 2},
+    "balanced": {"model_complexity": 1, "smooth_landmarks": True, "input_scale": 1.0, "stride": 1},
+    "accurate": {"model_complexity": 2, "smooth_landmarks": True, "input_scale": 1.0, "stride": 1},
+}
+DEFAULT_PROFILE = "balanced"
+
+# Bump whenever a change alters the extracted landmarks, so cached extractions are not reused
+EXTRACTOR_VERSION = 2
+
+# Suffix of the checkpoint kept next to the output file while a video is processed
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+def mp_solutions():
+    """
+    MediaPipe's solutions package (pose, drawing utilities), imported on first use.
+    """
+    import mediapipe as mp
+    return mp.solutions
+
+def mediapipe_version() -> str:
+    """
+    Installed MediaPipe version, read from the package metadata without importing it.
+    """
+    return version("mediapipe")
+
+def pose_options(profile: str = DEFAULT_PROFILE) -> dict:
+    """
+    Keyword arguments for mp_pose.Pose under a profile.
+    """
+    settings = PROFILES[profile]
+    return dict(POSE_OPTIONS, model_complexity=settings["model_complexity"],
+                smooth_landmarks=settings["smooth_landmarks"])
+
+def create_pose(profile: str = DEFAULT_PROFILE):
+    """
+    Create a MediaPipe Pose graph configured for a profile (use it as a context manager).
+    """
+    return mp_solutions().pose.Pose(**pose_options(profile))
+
+# Hip, knee and ankle landmarks of the knee angles drawn on the overlay (left, right)
+KNEE_ANGLE_LANDMARKS = np.array([[23, 25, 27], [24, 26, 28]])
+
+def knee_angles(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Calculate the left and right knee angles (degrees) from a frame's (33, 4)
+    landmark row, as returned by LandmarkBuffer.append / landmarks_to_array.
+    """
+    from kinematics_calculator import calculate_angles
+    
+    points = landmarks[KNEE_ANGLE_LANDMARKS, :3].astype(np.float64)
+    return calculate_angles(points[:, 0], points[:, 1], points[:, 2])
+
+def video_metadata(input_file: str, fps: float, frame_width: int, frame_height: int, total_frames: int,
+                   profile: str = DEFAULT_PROFILE) -> dict:
+    """
+    Capture metadata stored alongside the landmarks in binary output formats.
+    """
+    return {
+        "source": input_file,
+        "fps": fps,
+        "width": frame_width,
+        "height": frame_height,
+        "total_frames": total_frames,
+        "profile": profile,
+        "profile_settings": PROFILES[profile],
+        "pose_options": pose_options(profile),
+        "mediapipe_version": mediapipe_version(),
+    }
+
+def extraction_params(profile: str = DEFAULT_PROFILE, target_fps: Optional[float] = None,
+                      adaptive_stride: bool = False, motion_threshold: float = 0.02, roi_crop: bool = False,
+                      roi_padding: float = 0.3, shards: int = 1, shard_overlap: int = 30) -> dict:
+    """
+    Every setting that affects the extracted landmarks, used to key the extraction cache.
+    """
+    return {
+        "extractor_version": EXTRACTOR_VERSION,
+        "mediapipe_version": mediapipe_version(),
+        "pose_options": pose_options(profile),
+        "profile_settings": PROFILES[profile],
+        "target_fps": target_fps,
+        "adaptive_stride": adaptive_stride,
+        "motion_threshold": motion_threshold if adaptive_stride else None,
+        "roi_padding": roi_padding if roi_crop else None,
+        "shards": shards,
+        "shard_overlap": shard_overlap if shards > 1 else None,
+    }
+
+def checkpoint_path(output_file: str) -> str:
+    """
+    Checkpoint file of an extraction: <output file>.checkpoint.json.
+    """
+    return output_file + CHECKPOINT_SUFFIX
+
+def load_checkpoint(output_file: str) -> Optional[dict]:
+    """
+    Load the checkpoint of an interrupted extraction, or None if there is none.
+    """
+    try:
+        with open(checkpoint_path(output_file), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def save_checkpoint(output_file: str, checkpoint: dict):
+    """
+    Save a checkpoint atomically, so a crash never leaves a truncated file.
+    """
+    temp_file = checkpoint_path(output_file) + ".tmp"
+    with open(temp_file, "w") as f:
+        json.dump(checkpoint, f, indent=4)
+    os.replace(temp_file, checkpoint_path(output_file))
+
+def extraction_summary(frames: int, frames_with_pose: int, seconds: float, output_file: Optional[str],
+                       frames_analyzed: Optional[int] = None, complete: bool = True) -> dict:
+    """
+    Summary of an extraction run: frames read, frames analyzed (run through
+    MediaPipe; all of them unless subsampling), frames with a detected pose,
+    wall-clock duration, the output file (None if no frame was analyzed) and
+    whether the whole video was processed (False when the run was stopped early).
+    """
+    return {
+        "frames": frames,
+        "frames_analyzed": frames if frames_analyzed is None else frames_analyzed,
+        "frames_with_pose": frames_with_pose,
+        "seconds": seconds,
+        "output": output_file,
+        "complete": complete,
+    }
+
+def draw_pose_overlay(image: np.ndarray, results, status_text: str, landmarks: Optional[np.ndarray] = None):
+    """
+    Draw the pose landmarks, knee angles and a status line onto a BGR image in place.
+    The angles are computed from `landmarks`, the frame's (33, 4) landmark row
+    (converted from the results if not given).
+    """
+    import cv2
+    from landmark_io import landmarks_to_array
+    
+    # Get frame dimensions
+    h, w, c = image.shape
+    
+    if results.pose_landmarks:
+        # Draw pose landmarks on the image
+        solutions = mp_solutions()
+        solutions.drawing_utils.draw_landmarks(
+            image,
+            results.pose_landmarks,
+            solutions.pose.POSE_CONNECTIONS,
+            landmark_drawing_spec=solutions.drawing_styles.get_default_pose_landmarks_style())
+        
+        # Calculate knee angles (both left and right) from the frame's landmark row
+        if landmarks is None:
+            landmarks = landmarks_to_array(results.pose_landmarks)
+        left_knee_angle, right_knee_angle = knee_angles(landmarks)
+        
+        # Display knee angles on the image
+        cv2.putText(image, f"Left Knee Angle: {left_knee_angle:.1f}°", 
+                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(image, f"Right Knee Angle: {right_knee_angle:.1f}°", 
+                    (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+    
+    # Display status (e.g. progress) at the bottom
+    cv2.putText(image, status_text, 
+                (10, h - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+def process_video(input_file: str, output_file: str, headless: bool = False, queue_size: int = 4,
+                  target_fps: Optional[float] = None, adaptive_stride: bool = False,
+                  motion_threshold: float = 0.02, roi_crop: bool = False, roi_padding: float = 0.3,
+                  profile: str = DEFAULT_PROFILE, timing: bool = False, trace_file: Optional[str] = None,
+                  annotated_output: Optional[str] = None, annotated_policy: str = "block",
+                  annotated_queue_size: int = 32, checkpoint_interval: float = 10.0, resume: bool = False,
+                  resume_warmup: int = 30):
+    """
+    Process a video file and extract pose data.
+    
+    Args:
+        input_file: Path to the input video file
+        output_file: Path to save the output file (.csv, .parquet, .npz or .h5)
+        headless: Skip all visualization (window, overlays, BGR conversion) for
+            maximum throughput and for machines without a display
+        queue_size: Capacity of the queues between the decode, inference and
+            post-processing stages
+        target_fps: Analyze the video at this rate instead of every frame;
+            skipped frames are grabbed but never decoded
+        adaptive_stride: Analyze more densely (up to every frame) while the
+            landmarks move quickly (see FrameSampler)
+        motion_threshold: Mean landmark displacement between analyzed frames
+            (normalized image coordinates) that triggers denser sampling
+        roi_crop: Run inference on a downscaled crop around the previous
+            frame's pose instead of the full frame (see RoiCropper)
+        roi_padding: Margin around the pose bounding box in ROI mode, as a fraction of its size
+        profile: Speed/accuracy profile (see PROFILES); target_fps overrides its stride
+        timing: Time every stage of every frame (read, cvtColor, pose.process,
+            landmark conversion, write, draw, display) and print a summary at the end
+        trace_file: Also write the per-frame timings as a Chrome trace JSON file (implies timing)
+        annotated_output: Also save the annotated frames (pose, knee angles, progress) to this
+            video file, encoded on a separate thread (works headless too)
+        annotated_policy: When the encoder falls behind, "block" waits for it (every frame is
+            kept) and "drop" discards annotated frames instead of slowing down extraction
+        annotated_queue_size: Annotated frames buffered ahead of the encoder
+        checkpoint_interval: Seconds between checkpoints (<output>.checkpoint.json) recording
+            the last processed frame once the landmarks up to it are flushed to disk; a
+            final checkpoint is written if the run is interrupted (0 disables checkpoints)
+        resume: Continue an interrupted run from its checkpoint instead of starting over
+        resume_warmup: Frames before the checkpoint run through the tracker (results
+            discarded) when resuming, so tracking and smoothing have settled again
+    
+    Returns a summary of the run (see extraction_summary; "complete" is False if it was
+    stopped with 'q'), or None if the video could not be opened.
+    """
+    import cv2
+    from landmark_io import LandmarkWriter
+    from pose_pipeline import AnnotatedVideoWriter, FrameSampler, PipelineFrame, PosePipeline, RoiCropper
+    
+    # Initialize video capture with the input file
+    cap = cv2.VideoCapture(input_file)
+    
+    # Check if video opened successfully
+    if not cap.isOpened():
+        print(f"Error: Could not open video file {input_file}")
+        return
+    
+    # Get video properties
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    print(f"Processing video: {input_file}")
+    print(f"Resolution: {frame_width}x{frame_height}, FPS: {fps}, Total frames: {total_frames}")
+    
+    # Landmarks are written to disk in batches as they are produced, so memory stays
+    # bounded and a crash keeps everything up to the last flush
+    metadata = video_metadata(input_file, fps, frame_width, frame_height, total_frames, profile)
+    settings = PROFILES[profile]
+    print(f"Profile: {profile} ({settings})")
+    
+    # Optional temporal subsampling; rows then keep their true source frame and timestamp
+    sampler = None
+    if target_fps or adaptive_stride or settings["stride"] > 1:
+        sampler = FrameSampler(fps, target_fps, adaptive_stride, motion_threshold, settings["stride"])
+        metadata["sampling"] = {
+            "stride": sampler.max_stride,
+            "target_fps": target_fps,
+            "adaptive_stride": adaptive_stride,
+            "motion_threshold": motion_threshold,
+        }
+        print(f"Analyzing every {sampler.max_stride} frame(s)" + (", denser during fast movement" if adaptive_stride else ""))
+    
+    # Optional tracking crop for high-resolution footage where the patient fills a fraction of the frame
+    roi = RoiCropper(padding=roi_padding) if roi_crop else None
+    if roi is not None:
+        metadata["roi_crop"] = {"padding": roi_padding, "max_size": roi.max_size}
+    
+    # Optional per-stage instrumentation of the hot path
+    timer = StageTimer(trace=trace_file is not None) if timing or trace_file else None
+    
+    # A checkpoint is only valid for the same video extracted with the same settings
+    checkpoint_base = {
+        "source": os.path.abspath(input_file),
+        "total_frames": total_frames,
+        "params": extraction_params(profile, target_fps, adaptive_stride, motion_threshold, roi_crop, roi_padding),
+    }
+    checkpoint = load_checkpoint(output_file) if resume else None
+    if resume and checkpoint is None:
+        print(f"No checkpoint found for {output_file}; processing from the start")
+    if checkpoint is not None and any(checkpoint.get(name) != value for name, value in checkpoint_base.items()):
+        print(f"Error: {checkpoint_path(output_file)} was written for another video or with different settings")
+        cap.release()
+        return
+    
+    # Frames up to the checkpoint are already saved; resume after it, first
+    # re-warming the tracker on the frames before it
+    last_frame = -1
+    frames_analyzed = 0
+    frames_with_pose = 0
+    start_frame = 0
+    if checkpoint is not None:
+        last_frame = checkpoint["last_frame"]
+        frames_analyzed = checkpoint["frames_analyzed"]
+        frames_with_pose = checkpoint["frames_with_pose"]
+        # Start on a frame the sampler would have analyzed, so the same frames are sampled
+        stride = sampler.max_stride if sampler is not None else 1
+        start_frame = max(last_frame + 1 - resume_warmup, 0) // stride * stride
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        start_frame = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        print(f"Resuming after frame {last_frame} ({checkpoint['frames_written']} frames saved), "
+              f"re-warming the tracker from frame {start_frame}")
+    
+    # Every analyzed frame gets a row with its source frame and timestamp, NaN where
+    # no pose was detected, so gaps stay visible on the time axis
+    try:
+        writer = LandmarkWriter(output_file, metadata,
+                                keep_frames=checkpoint["frames_written"] if checkpoint is not None else 0)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not resume {output_file} ({e})")
+        cap.release()
+        return
+    
+    # Initialize MediaPipe Pose
+    with create_pose(profile) as pose, writer:
+        
+        next_report = 100
+        next_checkpoint = time.monotonic() + checkpoint_interval
+        quit_requested = False
+        
+        def write_checkpoint():
+            """
+            Record the last processed frame once everything up to it is on disk.
+            """
+            writer.flush()
+            save_checkpoint(output_file, dict(checkpoint_base, last_frame=last_frame,
+                                              frames_analyzed=frames_analyzed,
+                                              frames_with_pose=frames_with_pose,
+                                              frames_written=writer.frames_written,
+                                              updated=time.strftime("%Y-%m-%d %H:%M:%S")))
+        
+        # Create a window to display the video processing
+        if not headless:
+            cv2.namedWindow('MediaPipe Pose Estimation', cv2.WINDOW_NORMAL)
+        
+        # Optional annotated video, encoded on its own thread so it never stalls extraction
+        video_writer = None
+        if annotated_output:
+            video_writer = AnnotatedVideoWriter(annotated_output, fps, annotated_queue_size, annotated_policy,
+                                                timer=timer)
+        
+        def handle_frame(frame: PipelineFrame):
+            """
+            Post-processing stage: store the landmarks and draw the overlay.
+            """
+            nonlocal next_report, next_checkpoint, last_frame, frames_analyzed, frames_with_pose
+            frame_count = frame.index + 1
+            if frame.index <= last_frame:
+                # Warm-up frame before the checkpoint: its landmarks are already saved
+                return None
+            
+            # Convert the landmarks straight into the writer's batch buffer (a NaN row without a pose)
+            if timer is not None:
+                step = timer.now()
+            landmarks = writer.append(frame.results.pose_landmarks, frame.index, frame.timestamp)
+            if timer is not None:
+                timer.record("landmarks", step, frame.index)
+            if frame.results.pose_landmarks:
+                frames_with_pose += 1
+            else:
+                landmarks = None
+            last_frame = frame.index
+            frames_analyzed += 1
+            
+            if checkpoint_interval and time.monotonic() >= next_checkpoint:
+                if timer is not None:
+                    step = timer.now()
+                write_checkpoint()
+                next_checkpoint = time.monotonic() + checkpoint_interval
+                if timer is not None:
+                    timer.record("checkpoint", step, frame.index)
+            
+            progress = frame_count / total_frames * 100 if total_frames > 0 else 0.0
+            
+            # Print progress every 100 frames (the analyzed frames may skip some)
+            if frame_count >= next_report:
+                print(f"Processed {frame_count}/{total_frames} frames ({progress:.1f}%)")
+                next_report = (frame_count // 100 + 1) * 100
+            
+            if headless and video_writer is None:
+                return None
+            
+            # Draw the pose, knee angles and progress on the (still BGR) decoded image
+            if timer is not None:
+                step = timer.now()
+            draw_pose_overlay(frame.image, frame.results, f"Progress: {progress:.1f}% (Frame {frame_count}/{total_frames})",
+                              landmarks)
+            if timer is not None:
+                timer.record("draw", step, frame.index)
+            if video_writer is not None:
+                # The image is not modified after this, so the encoder can use it without a copy;
+                # the frame's buffers are only reused once the encoder releases them
+                frame.retain()
+                video_writer.write(frame.image, frame.index, frame.release)
+            return None if headless else frame.image
+        
+        def show_frame(image: np.ndarray) -> bool:
+            """
+            Display the latest annotated frame (main thread); returns False on 'q'.
+            """
+            nonlocal quit_requested
+            cv2.imshow('MediaPipe Pose Estimation', image)
+            
+            # Exit on 'q' press
+            quit_requested = cv2.waitKey(1) & 0xFF == ord('q')
+            return not quit_requested
+        
+        # Decode, inference and post-processing run concurrently through bounded queues
+        pipeline = PosePipeline(cap, pose, handle_frame, queue_size=queue_size, sampler=sampler, roi=roi,
+                                input_scale=settings["input_scale"], timer=timer, start_frame=start_frame)
+        start_time = time.perf_counter()
+        completed = False
+        try:
+            pipeline.run(display=None if headless else show_frame)
+            elapsed = time.perf_counter() - start_time
+            completed = not quit_requested
+        finally:
+            # Finish the annotated video, then report the timings even if the run was interrupted
+            if video_writer is not None:
+                video_writer.close()
+            if timer is not None:
+                print(timer.report())
+                if trace_file:
+                    timer.write_trace(trace_file)
+            if checkpoint_interval and not completed:
+                # Every processed frame is saved when the writer closes, so the run can resume after the last one
+                writer.close()
+                write_checkpoint()
+                print(f"Run interrupted after frame {last_frame}; checkpoint saved to {checkpoint_path(output_file)} "
+                      "(continue with --resume)")
+        frame_count = start_frame + pipeline.frames_read
+        
+        # Report throughput so headless and interactive runs can be compared; after a
+        # resume only the frames read by this run count towards it
+        if pipeline.frames_read > 0 and elapsed > 0:
+            print(f"Processed {pipeline.frames_read} frames in {elapsed:.1f} s "
+                  f"({pipeline.frames_read / elapsed:.1f} frames per second)")
+            if start_frame > 0:
+                print(f"Resumed from frame {start_frame}: {frame_count} frames of the video processed in total")
+            if sampler is not None:
+                print(f"Analyzed {frames_analyzed} of {frame_count} frames ({frames_analyzed / frame_count:.1%})")
+        print(pipeline.report())
+        if roi is not None:
+            print(roi.report())
+        if video_writer is not None:
+            print(video_writer.report())
+        
+        # Release resources
+        cap.release()
+        if not headless:
+            cv2.destroyAllWindows()
+        
+        # Write the remaining landmarks and finish the file
+        writer.close()
+        if completed and os.path.exists(checkpoint_path(output_file)):
+            os.remove(checkpoint_path(output_file))
+        # Every analyzed frame has a row (NaN without a pose), so the file exists whenever a frame was analyzed
+        if frames_analyzed:
+            print(f"Processing complete. Data saved to {output_file}")
+            if frames_with_pose < frames_analyzed:
+                print(f"No pose detected in {frames_analyzed - frames_with_pose} of {frames_analyzed} "
+                      "analyzed frames (saved as NaN rows)")
+        else:
+            print("No frames were analyzed.")
+        
+        return extraction_summary(frame_count, frames_with_pose, elapsed,
+                                  output_file if frames_analyzed else None, frames_analyzed, completed)
+
+def decode_frames(cap, input_scale: float = 1.0, stride: int = 1, frame_index: int = 0,
+                  end_frame: Optional[int] = None,
+                  clock: Optional[Callable[[], float]] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Read the frames of an opened capture for a Pose graph, reusing the same
+    buffers for every frame: each frame is read, downscaled by input_scale
+    and converted to RGB with the dst= forms of the OpenCV calls. Only frames
+    whose index is a multiple of `stride` are decoded; the others are grabbed
+    and skipped.
+    
+    Yields (frame_index, timestamp, image_rgb) until the capture ends or
+    end_frame is reached, frame_index counting from the given one. The
+    timestamp is clock() taken right after the read (default: the capture
+    position in seconds). image_rgb is read-only and overwritten by the next frame.
+    """
+    import cv2
+    
+    # Frame buffers read, resized and converted into again for every frame
+    image = resized = image_rgb = None
+    while end_frame is None or frame_index < end_frame:
+        if frame_index % stride:
+            # Skipped frame: advance without decoding it
+            if not cap.grab():
+                break
+            frame_index += 1
+            continue
+        
+        success, image = cap.read(image)
+        if not success:
+            break
+        timestamp = clock() if clock is not None else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        
+        small = image
+        if input_scale != 1.0:
+            small = resized = cv2.resize(image, None, dst=resized, fx=input_scale, fy=input_scale,
+                                         interpolation=cv2.INTER_LINEAR)
+        if image_rgb is not None:
+            image_rgb.flags.writeable = True
+        image_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=image_rgb)
+        image_rgb.flags.writeable = False
+        yield frame_index, timestamp, image_rgb
+        frame_index += 1
+
+def extract_frame_range(input_file: str, start_frame: int, end_frame: Optional[int], warmup_frames: int = 0,
+                        profile: str = DEFAULT_PROFILE):
+    """
+    Extract pose landmarks from frames [start_frame, end_frame) of a video
+    (end_frame None reads to the end), with its own Pose graph. The tracker
+    is first run on up to warmup_frames frames before start_frame, whose
+    results are discarded, so tracking has settled when the range begins.
+    With a profile stride above 1, only frames whose index is a multiple of
+    the stride are analyzed, so shards sample the same frames as a serial run.
+    
+    Returns (frame_indices, timestamps, landmarks) arrays for the analyzed
+    frames, the landmarks of shape (frames, 33, 4) and NaN where no pose was detected.
+    """
+    import cv2
+    from landmark_io import LandmarkBuffer
+    
+    cap = cv2.VideoCapture(input_file)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file {input_file}")
+    
+    # Seek to the start of the warm-up window
+    first_frame = max(start_frame - warmup_frames, 0)
+    if first_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    first_frame = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    
+    buffer = LandmarkBuffer()
+    settings = PROFILES[profile]
+    
+    with create_pose(profile) as pose:
+        for frame_index, timestamp, image_rgb in decode_frames(cap, settings["input_scale"], settings["stride"],
+                                                               first_frame, end_frame):
+            results = pose.process(image_rgb)
+            # Only keep results once the warm-up frames are done
+            if frame_index >= start_frame:
+                buffer.append(results.pose_landmarks, frame_index, timestamp)
+    
+    cap.release()
+    
+    return buffer.frames, buffer.timestamps, buffer.landmarks
+
+def shard_ranges(total_frames: int, num_shards: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split [0, total_frames) into num_shards contiguous frame ranges. The last
+    range is open-ended (None) because container frame counts can be inexact.
+    """
+    num_shards = max(1, min(num_shards, total_frames))
+    bounds = [round(i * total_frames / num_shards) for i in range(num_shards + 1)]
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(num_shards)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+def process_video_sharded(input_file: str, output_file: str, workers: Optional[int] = None, overlap: int = 30,
+                          profile: str = DEFAULT_PROFILE):
+    """
+    Process a video file on several CPU cores by splitting it into frame-range
+    shards, each extracted by a worker process with its own Pose graph and
+    seeked video capture. Each shard first warms up the tracker on the
+    `overlap` frames before its range; the shards are merged in frame order.
+    
+    Args:
+        input_file: Path to the input video file
+        output_file: Path to save the output file (.csv, .parquet, .npz or .h5)
+        workers: Number of worker processes (default: number of CPU cores)
+        overlap: Number of warm-up frames processed before each shard
+        profile: Speed/accuracy profile (see PROFILES)
+    
+    Returns a summary of the run (see extraction_summary), or None if the video could not be processed.
+    """
+    import cv2
+    from landmark_io import LandmarkWriter
+    
+    cap = cv2.VideoCapture(input_file)
+    if not cap.isOpened():
+        print(f"Error: Could not open video file {input_file}")
+        return
+    
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    
+    if total_frames <= 0:
+        print("Error: Video does not report a frame count, so it cannot be split into shards")
+        return
+    
+    workers = workers or os.cpu_count() or 1
+    ranges = shard_ranges(total_frames, workers)
+    
+    print(f"Processing video: {input_file}")
+    print(f"Resolution: {frame_width}x{frame_height}, FPS: {fps}, Total frames: {total_frames}")
+    print(f"Splitting into {len(ranges)} shards across {workers} worker processes ({overlap} warm-up frames each)")
+    
+    start_time = time.perf_counter()
+    
+    metadata = video_metadata(input_file, fps, frame_width, frame_height, total_frames, profile)
+    metadata["shards"] = len(ranges)
+    metadata["shard_overlap"] = overlap
+    writer = LandmarkWriter(output_file, metadata)
+    frames_analyzed = 0
+    frames_with_pose = 0
+    
+    # Closed (and its parts merged) even if a shard fails, so no unmerged parts are left behind
+    with writer:
+        # Use fresh interpreters so no MediaPipe or OpenCV thread state is inherited
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(extract_frame_range, input_file, start, end, overlap if start > 0 else 0, profile)
+                for start, end in ranges
+            ]
+            # Collect the shards in frame order
+            for shard_number, future in enumerate(futures, start=1):
+                shard_frames, shard_timestamps, shard_landmarks = future.result()
+                # Write each shard as soon as it is merged so only one is held in memory
+                for frame_index, timestamp, frame_landmarks in zip(shard_frames, shard_timestamps, shard_landmarks):
+                    writer.append(frame_landmarks, frame_index, timestamp)
+                shard_poses = int(np.count_nonzero(~np.isnan(shard_landmarks[:, 0, 0])))
+                frames_analyzed += len(shard_frames)
+                frames_with_pose += shard_poses
+                print(f"Shard {shard_number}/{len(ranges)} done "
+                      f"({shard_poses} of {len(shard_frames)} frames with a pose)")
+        
+        elapsed = time.perf_counter() - start_time
+        print(f"Processed {total_frames} frames in {elapsed:.1f} s ({total_frames / elapsed:.1f} frames per second)")
+    
+    if frames_analyzed:
+        print(f"Processing complete. Data saved to {output_file}")
+        if frames_with_pose < frames_analyzed:
+            print(f"No pose detected in {frames_analyzed - frames_with_pose} of {frames_analyzed} "
+                  "analyzed frames (saved as NaN rows)")
+    else:
+        print("No frames were analyzed.")
+    
+    return extraction_summary(total_frames, frames_with_pose, elapsed,
+                              output_file if frames_analyzed else None, frames_analyzed)
+
+def iter_landmarks(source: Union[str, int], profile: str = DEFAULT_PROFILE, target_fps: Optional[float] = None,
+                   adaptive_stride: bool = False, motion_threshold: float = 0.02, roi_crop: bool = False,
+                   roi_padding: float = 0.3, start_frame: int = 0, queue_size: int = 4, ring_size: int = 2,
+                   timer: Optional[StageTimer] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Extract pose landmarks from a video file or webcam as a generator, without
+    writing a file or drawing anything. Decoding and inference run on a
+    PosePipeline in the background while the caller consumes the frames.
+    
+    Yields (frame_index, timestamp, landmarks) for every analyzed frame, the
+    landmarks a (33, 4) float32 array of x, y, z and visibility (NaN where no
+    pose was detected) that the caller may keep. A webcam yields until the
+    generator is closed (e.g. by leaving the for loop), which stops the pipeline.
+    
+    Args:
+        source: Path of a video file, or the index of a webcam
+        profile: Speed/accuracy profile (see PROFILES); target_fps overrides its stride
+        target_fps: Analyze the video at this rate instead of every frame
+        adaptive_stride: Analyze more densely while the landmarks move quickly (see FrameSampler)
+        motion_threshold: Mean landmark displacement between analyzed frames that triggers denser sampling
+        roi_crop: Run inference on a crop around the previous frame's pose (see RoiCropper)
+        roi_padding: Margin around the pose bounding box in ROI mode, as a fraction of its size
+        start_frame: First frame of a video file to analyze
+        queue_size: Capacity of the queues between the pipeline stages and the caller
+        ring_size: Freshest frames kept for inference from a webcam; older ones are dropped
+        timer: Record per-frame stage timings (see StageTimer)
+    """
+    import cv2
+    from landmark_io import LANDMARK_VALUES, NUM_LANDMARKS, landmarks_to_array
+    from pose_pipeline import END_OF_STREAM, FrameSampler, PipelineFrame, PosePipeline, RoiCropper
+    
+    live = isinstance(source, int)
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open {'camera' if live else 'video file'} {source}")
+    try:
+        if live:
+            # Keep the driver from queueing stale frames; the capture thread reads continuously
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        elif start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        first_frame = 0 if live else int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        
+        settings = PROFILES[profile]
+        sampler = None
+        if target_fps or adaptive_stride or settings["stride"] > 1:
+            sampler = FrameSampler(cap.get(cv2.CAP_PROP_FPS), target_fps, adaptive_stride, motion_threshold,
+                                   settings["stride"])
+        roi = RoiCropper(padding=roi_padding) if roi_crop else None
+        
+        # Landmarks handed from the post-processing thread to the caller
+        landmark_queue = queue.Queue(maxsize=queue_size)
+        errors = []
+        
+        def handle_frame(frame: PipelineFrame):
+            """
+            Post-processing stage: copy the landmarks out of the recycled frame.
+            """
+            landmarks = np.full((NUM_LANDMARKS, LANDMARK_VALUES), np.nan, dtype=np.float32)
+            if frame.results.pose_landmarks:
+                landmarks_to_array(frame.results.pose_landmarks, landmarks)
+            # Gives up if the caller closed the generator while the queue is full
+            pipeline.put(landmark_queue, (frame.index, frame.timestamp, landmarks))
+            return None
+        
+        def run_pipeline():
+            try:
+                pipeline.run()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                pipeline.put(landmark_queue, END_OF_STREAM)
+        
+        with create_pose(profile) as pose:
+            # Inference runs in its own thread so frames are extracted while the caller works on earlier ones
+            pipeline = PosePipeline(cap, pose, handle_frame, queue_size=queue_size, live=live, sampler=sampler, roi=roi,
+                                    input_scale=settings["input_scale"], timer=timer, ring_size=ring_size,
+                                    start_frame=first_frame)
+            runner = threading.Thread(target=run_pipeline, name="pose-inference", daemon=True)
+            runner.start()
+            try:
+                while True:
+                    item = landmark_queue.get()
+                    if item is END_OF_STREAM:
+                        break
+                    yield item
+            finally:
+                pipeline.stop()
+                # Drain the queue so the pipeline threads can exit
+                while runner.is_alive():
+                    try:
+                        landmark_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+    finally:
+        # Also released when the Pose graph could not be created
+        cap.release()
+    
+    if errors:
+        raise errors[0]
+
+def record_webcam(camera: int = 0, file_format: str = "csv", output_file: Optional[str] = None,
+                  queue_size: int = 4, ring_size: int = 2, roi_crop: bool = False, profile: str = DEFAULT_PROFILE,
+                  segment_minutes: Optional[float] = None, segment_frames: Optional[int] = None,
+                  stream: bool = False, stream_host: Optional[str] = None, stream_port: Optional[int] = None):
+    """
+    Record pose data from a webcam with a live preview until 'q' is pressed.
+    
+    Args:
+        camera: Index of the webcam
+        file_format: Output format (csv, parquet, npz or h5) of the default output file
+        output_file: Path of the output file (default: pose_data_<timestamp>.<file_format>)
+        queue_size: Frames buffered between the inference and post-processing stages
+        ring_size: Freshest camera frames kept for inference; older ones are dropped
+        roi_crop: Run inference on a crop around the previous frame's pose (see RoiCropper)
+        profile: Speed/accuracy profile (see PROFILES)
+        segment_minutes: Start a new segment file every N minutes of recording
+        segment_frames: Start a new segment file every N recorded frames
+        stream: Publish each frame's landmarks and angles live (see landmark_stream.py)
+        stream_host: Interface the stream listens on (default: landmark_stream.DEFAULT_HOST)
+        stream_port: TCP port of the stream (default: landmark_stream.DEFAULT_PORT)
+    
+    Returns the output file, or None if the stream could not be started.
+    """
+    import cv2
+    from landmark_io import LandmarkWriter, SegmentedLandmarkWriter
+    from pose_pipeline import FrameSampler, PipelineFrame, PosePipeline, RoiCropper
+    
+    settings = PROFILES[profile]
+    
+    # Initialize webcam
+    cap = cv2.VideoCapture(camera)
+    
+    # Set video resolution
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Keep the driver from queueing stale frames; the capture thread reads continuously
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    
+    # Get the actual capture properties (recorded in the output metadata)
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    
+    # Landmarks are written to disk as they are recorded (flushed every few
+    # seconds), so long sessions don't grow memory and a crash loses little data
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    metadata = {
+        "source": f"webcam:{camera}",
+        "start_time": None,
+        "fps": fps,
+        "width": frame_width,
+        "height": frame_height,
+        "profile": profile,
+        "profile_settings": settings,
+        "pose_options": pose_options(profile),
+        "mediapipe_version": mediapipe_version(),
+    }
+    # With a stride above 1, the frames in between are grabbed from the camera and dropped
+    sampler = FrameSampler(fps, stride=settings["stride"]) if settings["stride"] > 1 else None
+    roi = RoiCropper() if roi_crop else None
+    if roi is not None:
+        metadata["roi_crop"] = {"padding": roi.padding, "max_size": roi.max_size}
+    # Stale camera frames are dropped when inference falls behind, so every row
+    # keeps its capture frame index and timestamp
+    output_file = output_file or f"pose_data_{timestamp}.{file_format}"
+    if segment_minutes or segment_frames:
+        # Long sessions roll over to numbered segment files tied together by
+        # pose_data_<timestamp>.session.json, which downstream tools read as one session
+        segment_seconds = segment_minutes * 60 if segment_minutes else None
+        writer = SegmentedLandmarkWriter(output_file, metadata, segment_frames=segment_frames,
+                                         segment_seconds=segment_seconds, flush_interval=2.0)
+    else:
+        writer = LandmarkWriter(output_file, metadata, flush_interval=2.0)
+    
+    # Optional live stream of every frame for the dashboard or backend
+    publisher = None
+    if stream:
+        from landmark_stream import DEFAULT_HOST, DEFAULT_PORT, LandmarkPublisher
+        
+        stream_host = stream_host or DEFAULT_HOST
+        stream_port = DEFAULT_PORT if stream_port is None else stream_port
+        try:
+            publisher = LandmarkPublisher(stream_host, stream_port, metadata)
+        except OSError as e:
+            print(f"Error: Could not start the stream on {stream_host}:{stream_port} ({e})")
+            cap.release()
+            return
+        print(f"Streaming landmarks on {publisher.host}:{publisher.port}")
+    
+    # Initialize MediaPipe Pose with higher detection and tracking confidence
+    with create_pose(profile) as pose, writer:
+        
+        def handle_frame(frame: PipelineFrame) -> np.ndarray:
+            """
+            Post-processing stage: store the landmarks and draw the overlay.
+            """
+            # The capture start time is only known once the pipeline runs
+            metadata["start_time"] = pipeline.start_time
+            # Convert the landmarks straight into the writer's batch buffer; frames
+            # without a pose are saved as NaN rows so gaps keep their timestamps
+            landmarks = writer.append(frame.results.pose_landmarks, frame.index, frame.timestamp)
+            if not frame.results.pose_landmarks:
+                landmarks = None
+            elif publisher is not None:
+                publisher.publish(frame.index, frame.timestamp, landmarks)
+            
+            # Draw the pose, knee angles, latency and instructions on the (still BGR) captured image
+            status = (f"Latency {frame.latency * 1000:.0f} ms, {pipeline.frames_dropped} frames dropped - "
+                      "press 'q' to quit and save data")
+            draw_pose_overlay(frame.image, frame.results, status, landmarks)
+            return frame.image
+        
+        def show_frame(image: np.ndarray) -> bool:
+            """
+            Display the latest annotated frame (main thread); returns False on 'q'.
+            """
+            cv2.imshow('MediaPipe Pose Estimation', image)
+            
+            # Exit on 'q' press
+            return cv2.waitKey(5) & 0xFF != ord('q')
+        
+        # A capture thread keeps the freshest frames in a ring buffer; inference and
+        # post-processing run concurrently through bounded queues
+        pipeline = PosePipeline(cap, pose, handle_frame, queue_size=queue_size, live=True,
+                                sampler=sampler, roi=roi, input_scale=settings["input_scale"],
+                                ring_size=ring_size)
+        try:
+            pipeline.run(display=show_frame)
+        finally:
+            # Tell subscribers the session is over
+            if publisher is not None:
+                publisher.close()
+        print(pipeline.report())
+        if roi is not None:
+            print(roi.report())
+        if publisher is not None:
+            print(publisher.report())
+        
+        # Release resources
+        cap.release()
+        cv2.destroyAllWindows()
+    
+    return output_file
@@ -0,0 +1,908 @@
+import collections
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+
+from instrumentation import StageTimer
+
+
+# Marks the end of the stream in the pipeline queues
+END_OF_STREAM = object()
+
+
+class PipelineFrame:
+    """
+    A frame travelling through the pipeline: source frame index, timestamp
+    (seconds), the decoded BGR image, its RGB conversion, the time.perf_counter()
+    value when it was captured and, after inference, the MediaPipe Pose results
+    and the capture-to-landmark latency in seconds.
+
+    Frames taken from a FramePool are reference counted: whoever keeps the
+    frame (or its image) beyond the stage it was handed to calls retain(),
+    and release() once done with it. The last release returns the frame and
+    its buffers to the pool, to be decoded into again.
+    """
+    __slots__ = ("index", "timestamp", "image", "image_rgb", "small", "captured", "results", "latency",
+                 "pool", "refs")
+
+    def __init__(self, index: int, timestamp: float, image: Optional[np.ndarray], image_rgb: Optional[np.ndarray],
+                 captured: Optional[float] = None, pool: Optional["FramePool"] = None):
+        self.index = index
+        self.timestamp = timestamp
+        self.image = image
+        self.image_rgb = image_rgb
+        # Downscaled copy of the image passed to MediaPipe (with an input scale)
+        self.small = None
+        self.captured = time.perf_counter() if captured is None else captured
+        self.results = None
+        self.latency = None
+        self.pool = pool
+        self.refs = 1
+
+    def retain(self):
+        """
+        Keep the frame's buffers from being reused until a matching release().
+        """
+        if self.pool is not None:
+            with self.pool.lock:
+                self.refs += 1
+
+    def release(self):
+        """
+        Drop one reference; the last one returns the frame to its pool.
+        """
+        if self.pool is not None:
+            self.pool.release(self)
+
+
+class FramePool:
+    """
+    Recycles PipelineFrames together with their image buffers, so the decode
+    stage reads, resizes and colour-converts into preallocated arrays (the
+    dst= forms of the OpenCV calls) instead of allocating new frame-sized
+    arrays for every frame. The pool only grows while more frames are in
+    flight (queued, displayed or waiting for the video encoder) than it holds.
+    """
+
+    def __init__(self):
+        self.free = []
+        self.lock = threading.Lock()
+        self.frames_allocated = 0
+        self.frames_acquired = 0
+
+    def acquire(self) -> PipelineFrame:
+        """
+        Return a free frame holding one reference (its buffers are reused if it had any).
+        """
+        with self.lock:
+            self.frames_acquired += 1
+            if self.free:
+                frame = self.free.pop()
+                frame.refs = 1
+                return frame
+            self.frames_allocated += 1
+        return PipelineFrame(-1, float("nan"), None, None, pool=self)
+
+    def release(self, frame: PipelineFrame):
+        with self.lock:
+            frame.refs -= 1
+            if frame.refs == 0:
+                frame.results = None
+                self.free.append(frame)
+
+    def report(self) -> str:
+        return (f"  frame buffers: {self.frames_allocated} allocated for {self.frames_acquired} frames "
+                f"({self.frames_acquired - self.frames_allocated} reused)")
+
+
+def discard(item):
+    """
+    Release a queued frame that will not be processed (END_OF_STREAM is ignored).
+    """
+    if isinstance(item, PipelineFrame):
+        item.release()
+
+
+class FrameRing:
+    """
+    Small ring buffer between a live capture thread and inference. put() never
+    blocks: when the ring is full the oldest frame is overwritten. get()
+    returns the newest frame and discards the older ones, so inference always
+    works on the freshest image and the camera is read at its own pace
+    instead of filling its driver buffer. Overwritten and discarded frames
+    are counted in `dropped`. It has the put/get/qsize interface of the
+    queue.Queue it replaces in PosePipeline.
+    """
+
+    def __init__(self, capacity: int = 2):
+        """
+        Args:
+            capacity: Number of frames held
+        """
+        self.frames = collections.deque(maxlen=max(1, capacity))
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, frame, timeout: Optional[float] = None):
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+                # The overwritten frame's buffers can be decoded into again
+                discard(self.frames[0])
+            self.frames.append(frame)
+            self.condition.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Return the newest frame, waiting up to `timeout` seconds (raises queue.Empty).
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.frames, timeout):
+                raise queue.Empty
+            frame = self.frames.pop()
+            # Older frames are stale once a newer one is taken
+            self.dropped += sum(1 for stale in self.frames if stale is not END_OF_STREAM)
+            for stale in self.frames:
+                discard(stale)
+            self.frames.clear()
+            return frame
+
+    def qsize(self) -> int:
+        return len(self.frames)
+
+
+class FrameSampler:
+    """
+    Chooses which source frames are analyzed. Frames are sampled every
+    `stride` source frames, where the base stride brings the source frame rate
+    down to `target_fps`. With `adaptive` enabled, the stride is halved (down
+    to every frame) whenever the mean landmark displacement between two
+    analyzed frames exceeds `motion_threshold`, and grows back one frame at a
+    time once the movement has calmed down.
+    """
+
+    def __init__(self, source_fps: float, target_fps: Optional[float] = None, adaptive: bool = False,
+                 motion_threshold: float = 0.02, stride: int = 1):
+        """
+        Args:
+            source_fps: Frame rate of the video
+            target_fps: Analysis rate when the movement is slow (default: every frame)
+            adaptive: Analyze frames more densely while landmarks move quickly
+            motion_threshold: Mean landmark displacement (normalized image
+                coordinates) between analyzed frames that triggers denser sampling
+            stride: Base stride used when no target_fps is given
+        """
+        if target_fps is not None and target_fps > 0 and source_fps > 0:
+            self.max_stride = max(1, int(round(source_fps / target_fps)))
+        else:
+            self.max_stride = max(1, stride)
+        self.stride = self.max_stride
+        self.adaptive = adaptive
+        self.motion_threshold = motion_threshold
+        self.previous = None
+
+    def observe(self, results):
+        """
+        Update the stride from the MediaPipe Pose results of the latest analyzed frame.
+        """
+        if not self.adaptive:
+            return
+        if not results.pose_landmarks:
+            # No reference point until the pose is found again
+            self.previous = None
+            return
+
+        current = np.array([(landmark.x, landmark.y) for landmark in results.pose_landmarks.landmark])
+        if self.previous is not None:
+            displacement = np.linalg.norm(current - self.previous, axis=1).mean()
+            if displacement > self.motion_threshold:
+                self.stride = max(1, self.stride // 2)
+            elif displacement < self.motion_threshold / 2:
+                self.stride = min(self.max_stride, self.stride + 1)
+        self.previous = current
+
+
+class RoiCropper:
+    """
+    Runs pose inference on a region of interest around the person instead of
+    the full frame. The ROI is the bounding box of the previous frame's
+    landmarks, padded by `padding` times its size on every side and made
+    square; crops larger than `max_size` pixels are downscaled. The landmarks
+    are mapped back to normalized full-frame coordinates, so the results can be
+    used exactly like those of pose.process on the full frame.
+
+    The ROI is only moved when the person leaves its inner part or becomes
+    much smaller than it, so MediaPipe's own tracker sees a stable view.
+    Moving the ROI invalidates that tracker, which then only re-detects the
+    person on its next call, so a freshly moved crop is processed a second time
+    if the first attempt finds nothing. When no pose is found in the crop (or
+    there is no ROI yet), the frame is processed in full.
+    """
+
+    def __init__(self, padding: float = 0.3, max_size: int = 1024, min_visibility: float = 0.5):
+        """
+        Args:
+            padding: Margin added around the landmark bounding box, as a fraction of its size
+            max_size: Longest side (pixels) of the crops passed to MediaPipe
+            min_visibility: Landmarks below this visibility are ignored for the bounding box
+        """
+        self.padding = padding
+        self.max_size = max_size
+        self.min_visibility = min_visibility
+        self.roi = None
+        self.roi_moved = False
+        # Reused for the crops while the ROI keeps its size (MediaPipe copies its input)
+        self.crop_buffer = None
+        self.cropped_frames = 0
+        self.full_frames = 0
+
+    def process(self, pose, image_rgb: np.ndarray):
+        """
+        Run pose.process on the ROI of image_rgb (or on the full frame) and
+        return the results in full-frame coordinates.
+        """
+        height, width = image_rgb.shape[:2]
+        results = None
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            crop = image_rgb[y0:y1, x0:x1]
+            scale = self.max_size / max(x1 - x0, y1 - y0)
+            if scale < 1:
+                crop = cv2.resize(crop, (round((x1 - x0) * scale), round((y1 - y0) * scale)),
+                                  dst=self.crop_buffer, interpolation=cv2.INTER_LINEAR)
+            else:
+                # MediaPipe needs a contiguous image, not a strided view
+                if self.crop_buffer is None or self.crop_buffer.shape != crop.shape:
+                    self.crop_buffer = np.empty_like(crop)
+                np.copyto(self.crop_buffer, crop)
+                crop = self.crop_buffer
+            self.crop_buffer = crop
+            results = pose.process(crop)
+            if not results.pose_landmarks and self.roi_moved:
+                # MediaPipe's tracker lost the person when the view moved; this call re-detects
+                results = pose.process(crop)
+            self.roi_moved = False
+            if results.pose_landmarks:
+                self.cropped_frames += 1
+                # Map crop-normalized coordinates back to the full frame (z shares the x scale)
+                for landmark in results.pose_landmarks.landmark:
+                    landmark.x = (x0 + landmark.x * (x1 - x0)) / width
+                    landmark.y = (y0 + landmark.y * (y1 - y0)) / height
+                    landmark.z = landmark.z * (x1 - x0) / width
+            else:
+                # Tracking lost: fall back to the full frame
+                results = None
+                self.roi = None
+
+        if results is None:
+            self.full_frames += 1
+            results = pose.process(image_rgb)
+
+        self.update(results, width, height)
+        return results
+
+    def update(self, results, width: int, height: int):
+        """
+        Move the ROI to follow the landmarks, if they left its inner part or shrank a lot.
+        """
+        if not results.pose_landmarks:
+            self.roi = None
+            return
+
+        points = np.array([(landmark.x * width, landmark.y * height, landmark.visibility)
+                           for landmark in results.pose_landmarks.landmark])
+        visible = points[points[:, 2] >= self.min_visibility]
+        if len(visible) < 4:
+            visible = points
+        left, top = visible[:, :2].min(axis=0)
+        right, bottom = visible[:, :2].max(axis=0)
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            margin = 0.1 * (x1 - x0)
+            inside = left >= x0 + margin and top >= y0 + margin and right <= x1 - margin and bottom <= y1 - margin
+            large_enough = max(right - left, bottom - top) >= 0.4 * (x1 - x0)
+            if inside and large_enough:
+                return
+
+        # New square ROI centered on the padded bounding box, clipped to the image
+        size = max(right - left, bottom - top) * (1 + 2 * self.padding)
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        x0 = int(max(0, center_x - size / 2))
+        y0 = int(max(0, center_y - size / 2))
+        x1 = int(min(width, center_x + size / 2))
+        y1 = int(min(height, center_y + size / 2))
+        if x1 - x0 < 32 or y1 - y0 < 32 or (x1 - x0) * (y1 - y0) > 0.8 * width * height:
+            # Too small to be reliable, or hardly smaller than the frame
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x1, y1)
+            self.roi_moved = True
+
+    def report(self) -> str:
+        """
+        Format how many frames were inferred on the ROI vs. the full frame.
+        """
+        total = self.cropped_frames + self.full_frames
+        share = self.cropped_frames / total if total else 0.0
+        return f"ROI crop: {self.cropped_frames}/{total} frames inferred on the ROI ({share:.1%}), {self.full_frames} on the full frame"
+
+
+class StageStats:
+    """
+    Throughput and queue-depth counters for one pipeline stage. Busy time only
+    counts the stage's own work, not time spent waiting on its queues, so the
+    stage with the highest busy time per item is the bottleneck.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.queue_depth_total = 0
+        self.queue_depth_max = 0
+        self.queue_samples = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, queue_depth: Optional[int] = None):
+        """
+        Count one processed item taking `seconds`, and sample the depth of the
+        stage's output queue.
+        """
+        with self.lock:
+            self.items += 1
+            self.busy += seconds
+            if queue_depth is not None:
+                self.queue_depth_total += queue_depth
+                self.queue_depth_max = max(self.queue_depth_max, queue_depth)
+                self.queue_samples += 1
+
+    def summary(self) -> dict:
+        """
+        Return items, busy seconds, per-item time, capacity (items/s if the
+        stage never waited) and output queue depth (mean and max).
+        """
+        with self.lock:
+            per_item = self.busy / self.items if self.items else 0.0
+            return {
+                "items": self.items,
+                "busy_seconds": self.busy,
+                "ms_per_item": per_item * 1000,
+                "capacity_fps": 1.0 / per_item if per_item > 0 else float("inf"),
+                "queue_depth_mean": self.queue_depth_total / self.queue_samples if self.queue_samples else 0.0,
+                "queue_depth_max": self.queue_depth_max,
+            }
+
+
+
+class LatencyStats:
+    """
+    Capture-to-landmark latency of a live pipeline. The mean and maximum are
+    running values over the whole recording; the p95 is taken over the
+    latest `window` frames, so memory stays fixed however long it runs.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def report(self) -> str:
+        p95 = np.percentile(np.asarray(self.recent), 95)
+        return (f"  capture-to-landmark latency mean {self.total / self.count * 1000:.1f} ms, "
+                f"p95 {p95 * 1000:.1f} ms (last {len(self.recent)} frames), max {self.max * 1000:.1f} ms")
+
+
+# Codec used for annotated videos, by file extension
+VIDEO_FOURCCS = {".mp4": "mp4v", ".m4v": "mp4v", ".mov": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}
+
+
+class AnnotatedVideoWriter:
+    """
+    Encodes annotated frames to a video file on a dedicated thread, so the
+    encoder never stalls extraction. Frames are handed over through a bounded
+    queue; when it is full, the "block" policy waits for the encoder (every
+    frame is kept, extraction slows to the encoding rate) and the "drop"
+    policy discards the frame. Frames missing from the sequence (dropped,
+    or skipped by the sampler) are filled by repeating the previous image, so
+    the video keeps the source's frame rate and timing.
+    """
+
+    POLICIES = ("block", "drop")
+
+    def __init__(self, filename: str, fps: float, queue_size: int = 32, policy: str = "block",
+                 fourcc: Optional[str] = None, timer: Optional[StageTimer] = None):
+        """
+        Args:
+            filename: Output video path; the extension selects the codec (see VIDEO_FOURCCS)
+            fps: Frame rate of the output video (that of the source)
+            queue_size: Frames buffered between the caller and the encoder thread
+            policy: "block" to wait for the encoder when the queue is full, "drop" to discard the frame
+            fourcc: Codec override (e.g. "XVID")
+            timer: Record the encoding time of every frame as the "encode" stage
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown annotated video policy '{policy}' (expected one of {', '.join(self.POLICIES)})")
+        extension = os.path.splitext(filename)[1].lower()
+        self.filename = filename
+        self.fps = fps if fps > 0 else 30.0
+        self.policy = policy
+        self.fourcc = fourcc or VIDEO_FOURCCS.get(extension, "mp4v")
+        self.timer = timer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = StageStats("encode")
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.frames_encoded = 0
+        self.frames_held = 0
+        self.last_index = None
+        self.blocked_seconds = 0.0
+        self.errors = []
+        self.closed = False
+        self.thread = threading.Thread(target=self.encode_loop, name="annotated-writer", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, image: np.ndarray, index: int, release: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Queue a BGR image showing source frame `index`. The image must not be
+        modified afterwards; `release` is called once the encoder no longer
+        needs it (e.g. PipelineFrame.release, so its buffer can be reused).
+        Returns False if it was dropped.
+        """
+        if self.errors:
+            if release is not None:
+                release()
+            raise self.errors[0]
+        self.last_index = index
+        if self.policy == "drop":
+            try:
+                self.queue.put_nowait((index, image, release))
+            except queue.Full:
+                self.frames_dropped += 1
+                if release is not None:
+                    release()
+                return False
+        else:
+            started = time.perf_counter()
+            while True:
+                try:
+                    self.queue.put((index, image, release), timeout=0.1)
+                    break
+                except queue.Full:
+                    if not self.thread.is_alive():
+                        raise self.errors[0] if self.errors else RuntimeError("Annotated video writer stopped")
+            self.blocked_seconds += time.perf_counter() - started
+        self.frames_queued += 1
+        return True
+
+    def encode_loop(self):
+        """
+        Encoder thread: open the video at the first frame's size and write the queued frames.
+        """
+        writer = None
+        previous_index = None
+        previous_image = None
+        previous_release = None
+        try:
+            while True:
+                item = self.queue.get()
+                if item is END_OF_STREAM:
+                    # Hold the last image over trailing frames that were dropped
+                    if previous_image is not None:
+                        for _ in range(self.last_index - previous_index):
+                            writer.write(previous_image)
+                            self.frames_held += 1
+                    break
+                index, image, release = item
+                started = time.perf_counter()
+                if self.timer is not None:
+                    step = self.timer.now()
+                if writer is None:
+                    height, width = image.shape[:2]
+                    writer = cv2.VideoWriter(self.filename, cv2.VideoWriter_fourcc(*self.fourcc), self.fps,
+                                             (width, height))
+                    if not writer.isOpened():
+                        raise IOError(f"Could not open {self.filename} for writing with codec {self.fourcc}")
+                if previous_image is not None:
+                    # Hold the previous image over frames that never reached the writer
+                    for _ in range(index - previous_index - 1):
+                        writer.write(previous_image)
+                        self.frames_held += 1
+                writer.write(image)
+                self.frames_encoded += 1
+                # The previous image is no longer needed to fill gaps
+                if previous_release is not None:
+                    previous_release()
+                previous_index, previous_image, previous_release = index, image, release
+                if self.timer is not None:
+                    self.timer.record("encode", step, index)
+                self.stats.record(time.perf_counter() - started, self.queue.qsize())
+        except Exception as e:
+            self.errors.append(e)
+            # Keep draining so a blocked caller can finish
+            while True:
+                item = self.queue.get()
+                if item is END_OF_STREAM:
+                    break
+                if item[2] is not None:
+                    item[2]()
+        finally:
+            if previous_release is not None:
+                previous_release()
+            if writer is not None:
+                writer.release()
+
+    def close(self):
+        """
+        Encode the queued frames and finish the video file.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(END_OF_STREAM)
+        self.thread.join()
+        if self.errors:
+            raise self.errors[0]
+        if self.frames_encoded:
+            print(f"Annotated video saved to {self.filename}")
+
+    def report(self) -> str:
+        """
+        Format the encoding throughput, independent of the pose throughput.
+        """
+        summary = self.stats.summary()
+        lines = [f"Annotated video: {self.frames_encoded} frames encoded ({self.frames_held} held over gaps), "
+                 f"{summary['ms_per_item']:.2f} ms/frame ({summary['capacity_fps']:.1f} fps encode capacity), "
+                 f"queue depth mean {summary['queue_depth_mean']:.1f} max {summary['queue_depth_max']}"]
+        if self.policy == "drop":
+            total = self.frames_queued + self.frames_dropped
+            share = self.frames_dropped / total if total else 0.0
+            lines.append(f"  dropped {self.frames_dropped} of {total} annotated frames ({share:.1%}) with a full queue")
+        else:
+            lines.append(f"  extraction waited {self.blocked_seconds:.2f} s for the encoder")
+        return "\n".join(lines)
+
+
+class PosePipeline:
+    """
+    Producer/consumer extraction pipeline:
+
+        decode thread -> [decode queue] -> inference (calling thread) -> [result queue] -> post-processing thread
+
+    The decode thread reads frames and converts them to RGB; pose.process runs
+    in the thread that calls run() (MediaPipe graphs are not shared across
+    threads); the post-processing thread runs the `postprocess` callback for
+    bookkeeping and drawing. Both queues are bounded so memory stays flat and
+    a slow stage applies back-pressure to the ones before it.
+
+    A live source cannot be slowed down, so with `live` the decode queue is a
+    FrameRing instead: the capture thread never waits, inference takes the
+    freshest frame and stale frames are dropped (and counted).
+
+    If `postprocess` returns an image, the latest such image is handed to the
+    `display` callback of run() in the calling thread, since OpenCV windows
+    must be driven from the main thread.
+
+    Frames and their image buffers come from a FramePool and are decoded into
+    again once released, so the steady-state frame path allocates no images.
+    A frame is released after `postprocess` returns (or after its returned
+    image is displayed); a callback that keeps it longer must retain() it.
+    """
+
+    def __init__(self, cap, pose, postprocess: Callable[[PipelineFrame], Optional[np.ndarray]],
+                 queue_size: int = 4, live: bool = False, sampler: Optional[FrameSampler] = None,
+                 roi: Optional[RoiCropper] = None, input_scale: float = 1.0,
+                 timer: Optional[StageTimer] = None, ring_size: int = 2, start_frame: int = 0):
+        """
+        Args:
+            cap: An opened cv2.VideoCapture
+            pose: A MediaPipe Pose instance
+            postprocess: Called with each inferred frame in the post-processing thread
+            queue_size: Capacity of each inter-stage queue
+            live: Live source (webcam): frames are captured into a FrameRing,
+                timestamps are capture times on a monotonic clock and read
+                failures are retried instead of ending the stream
+            sampler: Selects the frames to analyze; skipped frames are grabbed
+                but never decoded (default: analyze every frame)
+            roi: Run inference on a crop around the person (default: full frames)
+            input_scale: Resize factor applied to the frames passed to MediaPipe
+                (the decoded image used for display keeps its full size)
+            timer: Record per-frame timings of the read, resize, cvtColor,
+                pose.process and display steps and the frame buffers they had to
+                allocate (the postprocess callback can add its own stages through
+                pipeline.timer)
+            ring_size: Frames held by the FrameRing of a live source
+            start_frame: Source index of the first frame read (when `cap` was
+                seeked before the run, e.g. to resume an extraction)
+        """
+        self.cap = cap
+        self.pose = pose
+        self.postprocess = postprocess
+        self.live = live
+        self.sampler = sampler
+        self.roi = roi
+        self.input_scale = input_scale
+        self.timer = timer
+        self.start_frame = start_frame
+        self.frames_read = 0
+        self.pool = FramePool()
+        self.decode_queue = FrameRing(ring_size) if live else queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self.display_queue = queue.Queue(maxsize=1)
+        self.stats = {
+            "decode": StageStats("decode"),
+            "inference": StageStats("inference"),
+            "postprocess": StageStats("postprocess"),
+        }
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.start_time = None
+        self.start_clock = None
+        self.latency = LatencyStats() if live else None
+
+    @property
+    def frames_dropped(self) -> int:
+        """
+        Captured frames discarded from the FrameRing of a live source.
+        """
+        return self.decode_queue.dropped if self.live else 0
+
+    def stop(self):
+        """
+        Ask all stages to finish; frames already decoded are still processed.
+        """
+        self.stop_event.set()
+
+    def put(self, target: queue.Queue, item) -> bool:
+        """
+        Put an item on a bounded queue, giving up if the pipeline is stopped
+        while the queue is full. Returns True if the item was queued.
+        """
+        while True:
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self.stop_event.is_set() and item is not END_OF_STREAM:
+                    return False
+
+    def decode_loop(self):
+        """
+        Decode stage: read frames, convert them to RGB and queue them for inference.
+        Frames skipped by the sampler are only grabbed, not decoded. Each frame is
+        read, resized and converted into the buffers of a recycled pool frame.
+        """
+        stats = self.stats["decode"]
+        timer = self.timer
+        frame_index = self.start_frame
+        skip = 0
+        try:
+            while not self.stop_event.is_set() and self.cap.isOpened():
+                started = time.perf_counter()
+                if timer is not None:
+                    step = timer.now()
+                # Advance past the skipped frames without decoding them; if the
+                # stream ends here, the read below fails and ends the loop
+                for _ in range(skip):
+                    if not self.cap.grab():
+                        break
+                    frame_index += 1
+                    self.frames_read += 1
+
+                frame = self.pool.acquire()
+                success, image = self.cap.read(frame.image)
+                if not success:
+                    frame.release()
+                    if self.live:
+                        print("Ignoring empty camera frame.")
+                        continue
+                    print("End of video or error reading frame.")
+                    break
+
+                captured = time.perf_counter()
+                if self.live:
+                    # Capture time on the monotonic clock, so timestamps don't follow wall-clock adjustments
+                    timestamp = captured - self.start_clock
+                else:
+                    timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                # OpenCV only allocates when the frame has no buffer yet or its size changed
+                if image is not frame.image:
+                    frame.image = image
+                    if timer is not None:
+                        timer.allocated("read")
+                if timer is not None:
+                    timer.record("read", step, frame_index)
+                    step = timer.now()
+                small = image
+                if self.input_scale != 1.0:
+                    # Downscale before the colour conversion so both run on the smaller image
+                    small = cv2.resize(image, None, dst=frame.small, fx=self.input_scale, fy=self.input_scale,
+                                       interpolation=cv2.INTER_LINEAR)
+                    if small is not frame.small:
+                        frame.small = small
+                        if timer is not None:
+                            timer.allocated("resize")
+                    if timer is not None:
+                        timer.record("resize", step, frame_index)
+                        step = timer.now()
+                if frame.image_rgb is not None:
+                    # It was made read-only for MediaPipe when the frame was last used
+                    frame.image_rgb.flags.writeable = True
+                image_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=frame.image_rgb)
+                if image_rgb is not frame.image_rgb:
+                    frame.image_rgb = image_rgb
+                    if timer is not None:
+                        timer.allocated("cvtColor")
+                image_rgb.flags.writeable = False
+                if timer is not None:
+                    timer.record("cvtColor", step, frame_index)
+                frame.index = frame_index
+                frame.timestamp = timestamp
+                frame.captured = captured
+                frame_index += 1
+                self.frames_read += 1
+                if self.sampler is not None:
+                    skip = self.sampler.stride - 1
+                stats.record(time.perf_counter() - started, self.decode_queue.qsize())
+
+                if not self.put(self.decode_queue, frame):
+                    frame.release()
+                    break
+        except Exception as e:
+            self.errors.append(e)
+            self.stop()
+        finally:
+            self.put(self.decode_queue, END_OF_STREAM)
+
+    def postprocess_loop(self):
+        """
+        Post-processing stage: run the postprocess callback on each inferred frame.
+        """
+        stats = self.stats["postprocess"]
+        while True:
+            frame = self.result_queue.get()
+            if frame is END_OF_STREAM:
+                break
+            if self.errors:
+                # Keep draining so the inference stage never blocks
+                frame.release()
+                continue
+            started = time.perf_counter()
+            try:
+                display_image = self.postprocess(frame)
+            except Exception as e:
+                self.errors.append(e)
+                self.stop()
+                frame.release()
+                continue
+            stats.record(time.perf_counter() - started)
+
+            if display_image is not None:
+                # The frame's image must stay unchanged until it has been displayed
+                owner = frame if display_image is frame.image else None
+                if owner is not None:
+                    owner.retain()
+                # Only the most recent image is worth showing
+                try:
+                    _, stale_owner = self.display_queue.get_nowait()
+                    if stale_owner is not None:
+                        stale_owner.release()
+                except queue.Empty:
+                    pass
+                self.display_queue.put_nowait((display_image, owner))
+            frame.release()
+
+    def run(self, display: Optional[Callable[[np.ndarray], bool]] = None):
+        """
+        Run the pipeline until the source ends or stop() is called. Inference
+        runs in the calling thread. `display` is called with the latest image
+        returned by postprocess and may return False to stop the pipeline.
+        Exceptions raised in the worker threads are re-raised here.
+        """
+        self.start_time = time.time()
+        self.start_clock = time.perf_counter()
+        decoder = threading.Thread(target=self.decode_loop, name="pose-capture" if self.live else "pose-decode",
+                                   daemon=True)
+        postprocessor = threading.Thread(target=self.postprocess_loop, name="pose-postprocess", daemon=True)
+        decoder.start()
+        postprocessor.start()
+
+        stats = self.stats["inference"]
+        timer = self.timer
+        try:
+            while True:
+                try:
+                    frame = self.decode_queue.get(timeout=0.05)
+                except queue.Empty:
+                    frame = None
+
+                if frame is END_OF_STREAM:
+                    break
+                if frame is not None:
+                    started = time.perf_counter()
+                    if timer is not None:
+                        step = timer.now()
+                    if self.roi is not None:
+                        frame.results = self.roi.process(self.pose, frame.image_rgb)
+                    else:
+                        frame.results = self.pose.process(frame.image_rgb)
+                    frame.latency = time.perf_counter() - frame.captured
+                    if self.latency is not None:
+                        self.latency.record(frame.latency)
+                    if timer is not None:
+                        timer.record("pose.process", step, frame.index)
+                    if self.sampler is not None:
+                        # Feed the movement back to the decode stage as early as possible
+                        self.sampler.observe(frame.results)
+                    stats.record(time.perf_counter() - started, self.result_queue.qsize())
+                    self.put(self.result_queue, frame)
+
+                if display is not None and not self.stop_event.is_set():
+                    try:
+                        display_image, owner = self.display_queue.get_nowait()
+                    except queue.Empty:
+                        display_image = None
+                    if display_image is not None:
+                        if timer is not None:
+                            step = timer.now()
+                        keep_running = display(display_image)
+                        if owner is not None:
+                            owner.release()
+                        if timer is not None:
+                            timer.record("display", step)
+                        if keep_running is False:
+                            self.stop()
+        finally:
+            self.stop()
+            # Drain the decode queue so the decode thread can exit, then flush post-processing
+            while decoder.is_alive():
+                try:
+                    discard(self.decode_queue.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+            self.put(self.result_queue, END_OF_STREAM)
+            postprocessor.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def report(self) -> str:
+        """
+        Format the per-stage throughput and queue depths, flagging the bottleneck.
+        """
+        summaries = {name: stats.summary() for name, stats in self.stats.items()}
+        bottleneck = max(summaries, key=lambda name: summaries[name]["ms_per_item"])
+        lines = ["Pipeline stages:"]
+        for name, summary in summaries.items():
+            queue_info = ""
+            if name != "postprocess":
+                queue_info = (f", output queue depth mean {summary['queue_depth_mean']:.1f} "
+                              f"max {summary['queue_depth_max']}")
+            marker = "  <- bottleneck" if name == bottleneck else ""
+            lines.append(f"  {name:<12} {summary['items']:6d} frames, {summary['ms_per_item']:7.2f} ms/frame "
+                         f"({summary['capacity_fps']:7.1f} fps capacity){queue_info}{marker}")
+        lines.append(self.pool.report())
+        if self.latency is not None and self.latency.count:
+            lines.append(self.latency.report())
+            share = self.frames_dropped / self.frames_read if self.frames_read else 0.0
+            lines.append(f"  dropped {self.frames_dropped} of {self.frames_read} captured frames ({share:.1%}) "
+                         f"that were superseded before inference")
+        return "\n".join(lines)
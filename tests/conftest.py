@@ -0,0 +1,48 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# The modules live at the top level of the repository, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def figure_frame(index: int, width: int = 256, height: int = 256) -> np.ndarray:
+    """
+    A drawn standing figure swaying and bending its knees, which MediaPipe
+    detects as a pose, so extraction tests need no recorded video.
+    """
+    image = np.full((height, width, 3), (200, 210, 220), np.uint8)
+    cx = width // 2 + int(6 * np.sin(index / 5))
+    skin, shirt, trousers = (140, 170, 220), (60, 60, 180), (90, 60, 40)
+    cv2.circle(image, (cx, 50), 16, skin, -1)
+    cv2.circle(image, (cx - 6, 46), 2, (30, 30, 30), -1)
+    cv2.circle(image, (cx + 6, 46), 2, (30, 30, 30), -1)
+    cv2.rectangle(image, (cx - 22, 68), (cx + 22, 140), shirt, -1)
+    for side in (-1, 1):
+        cv2.line(image, (cx + side * 22, 74), (cx + side * 40, 110), shirt, 10)
+        cv2.line(image, (cx + side * 40, 110), (cx + side * 44, 145), skin, 8)
+        knee = (cx + side * (14 + int(4 * np.sin(index / 4))), 185)
+        cv2.line(image, (cx + side * 12, 140), knee, trousers, 14)
+        cv2.line(image, knee, (cx + side * 14, 232), trousers, 12)
+        cv2.line(image, (cx + side * 14, 234), (cx + side * 26, 238), (20, 20, 20), 8)
+    return image
+
+
+@pytest.fixture(scope="session")
+def synthetic_clip(tmp_path_factory) -> str:
+    """
+    A 90-frame, 30 fps MJPG clip of figure_frame, with a few blank frames
+    (no pose) in the middle.
+    """
+    filename = str(tmp_path_factory.mktemp("clips") / "figure.avi")
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (256, 256))
+    for index in range(90):
+        frame = figure_frame(index)
+        if 40 <= index < 44:
+            frame[:] = (200, 210, 220)
+        writer.write(frame)
+    writer.release()
+    return filename
@@ -0,0 +1,172 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import motion_extract_multicam
+from landmark_io import LandmarkWriter, frame_landmarks, load_landmarks, load_multicam_landmarks
+from pose_extraction import (PROFILES, extract_frame_range, load_checkpoint, process_video, process_video_sharded,
+                             shard_ranges)
+
+
+def load_rows(filename: str):
+    df = load_landmarks(filename)
+    return df.index.to_numpy(), df["timestamp"].to_numpy(), frame_landmarks(df)
+
+
+def test_sharded_extraction_matches_serial(synthetic_clip, tmp_path):
+    # Three shards start at frames 30 and 60, away from the blank frames 40-43, so both
+    # warm-up windows (15-29 and 45-59) run the tracker on frames with a pose
+    overlap = 15
+    assert shard_ranges(90, 3) == [(0, 30), (30, 60), (60, None)]
+    serial = process_video(synthetic_clip, str(tmp_path / "serial.npz"), headless=True, checkpoint_interval=0)
+    sharded = process_video_sharded(synthetic_clip, str(tmp_path / "sharded.npz"), workers=3, overlap=overlap)
+    assert serial["complete"] and sharded["complete"]
+    assert serial["frames_analyzed"] == sharded["frames_analyzed"] == 90
+
+    serial_frames, serial_timestamps, serial_landmarks = load_rows(str(tmp_path / "serial.npz"))
+    sharded_frames, sharded_timestamps, sharded_landmarks = load_rows(str(tmp_path / "sharded.npz"))
+    np.testing.assert_array_equal(sharded_frames, serial_frames)
+    np.testing.assert_array_equal(sharded_timestamps, serial_timestamps)
+    # The blank frames have no pose in either run, the figure is found everywhere else
+    np.testing.assert_array_equal(np.isnan(sharded_landmarks[:, 0, 0]), np.isnan(serial_landmarks[:, 0, 0]))
+    assert np.isnan(serial_landmarks[40:44]).all() and not np.isnan(serial_landmarks[:40]).any()
+
+    # The first shard runs the same frames through the same tracker state as the serial run
+    first = serial_frames < 30
+    np.testing.assert_array_equal(sharded_landmarks[first], serial_landmarks[first])
+    # Losing the pose on the blank frames resets MediaPipe's tracker in both runs, so the
+    # rest of the second shard has the same coordinates (not the same visibility, whose
+    # smoothing is not reset)
+    after_gap = (serial_frames >= 44) & (serial_frames < 60)
+    np.testing.assert_array_equal(sharded_landmarks[after_gap, :, :3], serial_landmarks[after_gap, :, :3])
+
+    # After a warm-up the tracker is close to, but not exactly in, the serial run's state:
+    # x and y match within 1% of the image, the noisier depth and the temporally smoothed
+    # visibility less closely
+    later = ~first & ~np.isnan(serial_landmarks[:, 0, 0])
+    error = np.abs(sharded_landmarks[later] - serial_landmarks[later])
+    assert error[:, :, :2].max() < 0.01
+    assert error[:, :, 2].max() < 0.15
+    assert error[:, :, 3].max() < 0.05
+    # Starting the same shards with a cold tracker strays at least twice as far
+    for start, end in [(30, 40), (60, None)]:
+        shard = (serial_frames >= start) & (serial_frames < (end or 90))
+        cold_frames, _, cold_landmarks = extract_frame_range(synthetic_clip, start, end, 0)
+        np.testing.assert_array_equal(cold_frames, serial_frames[shard])
+        warm_error = np.abs(sharded_landmarks[shard] - serial_landmarks[shard]).mean()
+        cold_error = np.abs(cold_landmarks - serial_landmarks[shard]).mean()
+        assert warm_error < 0.6 * cold_error
+
+
+class Interrupted(Exception):
+    pass
+
+
+def read_rows(filename: str):
+    if filename.endswith(".csv"):
+        df = pd.read_csv(filename)
+        values = df.drop(columns=["frame", "timestamp"]).to_numpy()
+        # x, y, z of every landmark, then the visibility of every landmark
+        landmarks = np.concatenate([values[:, :99].reshape(-1, 33, 3), values[:, 99:, None]], axis=2)
+        return df["frame"].to_numpy(), df["timestamp"].to_numpy(), landmarks
+    return load_rows(filename)
+
+
+@pytest.mark.parametrize("extension", ["csv", "npz"])
+def test_resume_after_interruption_matches_uninterrupted_run(synthetic_clip, tmp_path, monkeypatch, extension):
+    reference_file = str(tmp_path / f"reference.{extension}")
+    output_file = str(tmp_path / f"resumed.{extension}")
+    process_video(synthetic_clip, reference_file, headless=True, checkpoint_interval=0)
+
+    # Fail in the post-processing stage after 60 frames, like a crash mid-run
+    append = LandmarkWriter.append
+    calls = [0]
+
+    def failing_append(self, *args, **kwargs):
+        calls[0] += 1
+        if calls[0] > 60:
+            raise Interrupted()
+        return append(self, *args, **kwargs)
+
+    monkeypatch.setattr(LandmarkWriter, "append", failing_append)
+    with pytest.raises(Interrupted):
+        process_video(synthetic_clip, output_file, headless=True, checkpoint_interval=0.05)
+    monkeypatch.undo()
+
+    checkpoint = load_checkpoint(output_file)
+    assert checkpoint is not None and checkpoint["last_frame"] == 59 and checkpoint["frames_written"] == 60
+
+    summary = process_video(synthetic_clip, output_file, headless=True, checkpoint_interval=0.05, resume=True,
+                            resume_warmup=10)
+    assert summary["complete"] and summary["frames_analyzed"] == 90
+    assert load_checkpoint(output_file) is None
+
+    reference_frames, reference_timestamps, reference_values = read_rows(reference_file)
+    frames, timestamps, values = read_rows(output_file)
+    np.testing.assert_array_equal(frames, reference_frames)
+    np.testing.assert_array_equal(timestamps, reference_timestamps)
+    # Rows saved before the interruption are kept exactly
+    saved = frames <= checkpoint["last_frame"]
+    np.testing.assert_array_equal(values[saved], reference_values[saved])
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(reference_values))
+    # Rows after it come from a tracker re-warmed on `resume_warmup` frames, so they are
+    # close to the uninterrupted run rather than identical, and converge towards it
+    resumed = ~saved & ~np.isnan(reference_values[:, 0, 0])
+    np.testing.assert_allclose(values[resumed, :, :2], reference_values[resumed, :, :2], atol=0.02)
+    np.testing.assert_allclose(values[resumed, :, 2], reference_values[resumed, :, 2], atol=0.15)
+    np.testing.assert_allclose(values[resumed, :, 3], reference_values[resumed, :, 3], atol=0.1)
+    np.testing.assert_allclose(values[-10:, :, :2], reference_values[-10:, :, :2], atol=0.005)
+
+
+def test_multicam_offsets_align_the_views(synthetic_clip, tmp_path, monkeypatch):
+    output_file = str(tmp_path / "multicam.npz")
+    monkeypatch.setattr(sys, "argv", ["motion_extract_multicam.py", "-i", synthetic_clip, synthetic_clip,
+                                      "--cameras", "front,side", "--offsets", "0,0.5", "-o", output_file])
+    motion_extract_multicam.main()
+
+    store = load_multicam_landmarks(output_file)
+    assert store["cameras"] == ["front", "side"]
+    # The side view started 0.5 s (15 frames) later, so the common interval runs from 0.5 s
+    # to the end of the front view, and the side view is 15 frames behind at every instant
+    np.testing.assert_allclose(store["timestamp"], 0.5 + np.arange(75) / 30)
+    np.testing.assert_array_equal(store["source_frame"][:, 0], np.arange(15, 90))
+    np.testing.assert_array_equal(store["source_frame"][:, 1], np.arange(75))
+    np.testing.assert_allclose(store["source_timestamp"][:, 1] + 0.5, store["timestamp"])
+
+    # Both views are the same clip, so the same source frame has the same landmarks in each
+    landmarks = store["landmarks"]
+    np.testing.assert_array_equal(landmarks[15:, 1], landmarks[:60, 0])
+    # The blank frames 40-43 have no pose in either view
+    np.testing.assert_array_equal(np.flatnonzero(np.isnan(landmarks[:, 0, 0, 0])), np.arange(25, 29))
+    np.testing.assert_array_equal(np.flatnonzero(np.isnan(landmarks[:, 1, 0, 0])), np.arange(40, 44))
+
+
+class ThreadExecutor(ThreadPoolExecutor):
+    """
+    Runs the multicam workers as threads, so a patched profile reaches them.
+    """
+
+    def __init__(self, max_workers=None, mp_context=None):
+        super().__init__(max_workers)
+
+
+def test_multicam_timeline_follows_the_profile_stride(synthetic_clip, tmp_path, monkeypatch):
+    monkeypatch.setitem(PROFILES, "balanced", dict(PROFILES["balanced"], stride=2))
+    monkeypatch.setattr(motion_extract_multicam, "ProcessPoolExecutor", ThreadExecutor)
+    output_file = str(tmp_path / "multicam.npz")
+    summary = motion_extract_multicam.process_cameras([synthetic_clip, synthetic_clip], output_file,
+                                                      ["front", "side"])
+    assert summary is not None
+
+    # Every other frame is analyzed, so the timeline runs at 15 fps and every instant
+    # is matched to an analyzed frame of each view
+    store = load_multicam_landmarks(output_file)
+    assert store["metadata"]["fps"] == 15
+    np.testing.assert_allclose(store["timestamp"], np.arange(45) / 15)
+    for camera in range(2):
+        np.testing.assert_array_equal(store["source_frame"][:, camera], np.arange(0, 90, 2))
+    with_pose = ~np.isnan(store["landmarks"][:, :, 0, 0])
+    np.testing.assert_array_equal(with_pose.sum(axis=0), [43, 43])